@@ -0,0 +1,209 @@
+import argparse
+import json
+import platform
+import random
+import time
+from itertools import cycle
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import equity
+import evaluator
+import new
+import preflop
+import selfplay
+from hand_state import HandState
+
+'''
+Benchmarks for the poker engine hot paths.
+
+Each benchmark is a setup function, run outside the timer, and an op that is
+timed on its own with perf_counter_ns, so every sample is the latency of one
+call. After a short warm-up the samples are summarised as ops/sec and
+p50/p99/max latency in microseconds.
+
+Seeds are fixed (random and NumPy) and every Game benchmark is run at a few
+realistic table sizes, so two runs on the same machine are comparable:
+
+    python bench.py --out bench.json
+    python bench.py --only evaluate,equity --compare bench.json
+
+With --compare, anything whose p50 is more than --tolerance slower than the
+saved baseline is reported and the exit code is 1.
+'''
+
+TABLE_SIZES = (2, 6, 9)
+DEFAULT_ITERATIONS = 2000
+
+
+def percentile(samples: Sequence[int], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure(name: str, setup: Callable[[], object], op: Callable[[object], object],
+            iterations: int = DEFAULT_ITERATIONS, warmup: int = 50) -> Dict:
+    for _ in range(warmup):
+        op(setup())
+    samples: List[int] = []
+    for _ in range(iterations):
+        state = setup()
+        start = time.perf_counter_ns()
+        op(state)
+        samples.append(time.perf_counter_ns() - start)
+    total = sum(samples)
+    return {
+        "name": name,
+        "iterations": iterations,
+        "ops_per_sec": iterations / (total / 1e9) if total else 0.0,
+        "p50_us": percentile(samples, 0.50) / 1000,
+        "p99_us": percentile(samples, 0.99) / 1000,
+        "max_us": max(samples) / 1000,
+    }
+
+
+def _game(players: int) -> new.Game:      # Fresh hand at a table of `players`, blinds posted
+    game = new.Game()
+    for seat in range(players):
+        game.add_player(seat)
+    game.reset_hand()
+    game.deal()
+    game.bet(game.players[0], 5)
+    game.bet(game.players[1], 10)
+    return game
+
+
+def game_benchmarks(players: int, iterations: int) -> List[Dict]:
+    game = _game(players)
+
+    def dealt():
+        game.reset_hand()
+        return game
+
+    def at_flop():      # Hand states built and three cards left to reveal
+        game.reset_hand()
+        game.deal()
+        return game
+
+    def seated():
+        return _game(players)
+
+    suffix = "[%d players]" % players
+    results = [
+        measure("deal" + suffix, dealt, lambda g: g.deal(), iterations),
+        measure("reveal_flop" + suffix, at_flop, lambda g: g.reveal_community(0, 3), iterations),
+        measure("process_turn_check" + suffix, seated, lambda g: g.process_turn("check", g.players[2 % players]), iterations),
+        measure("process_turn_raise" + suffix, seated, lambda g: g.process_turn("raise", g.players[2 % players], 20), iterations),
+        measure("check" + suffix, seated, lambda g: g.check(g.players[0]), iterations),
+        measure("call" + suffix, seated, lambda g: g.call(g.players[0], 10), iterations),
+        measure("raiseBet" + suffix, seated, lambda g: g.raiseBet(g.players[0], 30), iterations),
+        measure("to_state" + suffix, seated, lambda g: g.to_state(), iterations),
+    ]
+
+    def at_river():
+        g = _game(players)
+        for _ in range(3):      # Flop, turn, river
+            g.end_round()
+        return g
+
+    results.append(measure("evaluate_hands" + suffix, at_river, lambda g: g.evaluate_hands(), iterations))
+    return results
+
+
+def evaluator_benchmarks(iterations: int) -> List[Dict]:
+    rng = random.Random(0)
+    hands = [rng.sample(evaluator.FULL_DECK, 7) for _ in range(iterations)]
+    batch = np.array(hands, dtype=np.int64)
+    evaluate_hands, state_hands = cycle(hands), cycle(hands)
+    return [
+        measure("evaluate_7", lambda: next(evaluate_hands), evaluator.evaluate, iterations),
+        measure("evaluate_batch_%d" % len(batch), lambda: batch, equity.evaluate_batch, max(iterations // 100, 10), warmup=2),
+        measure("hand_state_river", lambda: next(state_hands), lambda cards: HandState(cards).rank, iterations),
+    ]
+
+
+def equity_benchmarks(iterations: int) -> List[Dict]:
+    rng = random.Random(1)
+    spots = []
+    for _ in range(iterations):
+        cards = rng.sample(evaluator.FULL_DECK, 5)
+        spots.append((cards[:2], cards[2:]))
+    it = cycle(spots)
+    runs = max(iterations // 200, 5)
+    results = [measure("equity_flop_2000x%d" % opponents, lambda: next(it),
+                       lambda spot, n=opponents: equity.equity(spot[0], spot[1], n, samples=2000, seed=0), runs, warmup=2)
+               for opponents in (1, 5)]
+    table = preflop.load_table()
+    if table is not None:
+        results.append(measure("preflop_lookup", lambda: next(it), lambda spot: table.lookup(spot[0], 5), iterations))
+    return results
+
+
+def selfplay_benchmarks(iterations: int) -> List[Dict]:
+    results = []
+    for players in TABLE_SIZES:
+        table = selfplay.SelfPlay(["random"] * players, seed=2)
+        results.append(measure("selfplay_hand[%d players]" % players, lambda: table, selfplay.SelfPlay.play_hand,
+                               max(iterations // 4, 10)))
+    return results
+
+
+SUITES = {
+    "game": lambda iterations: [r for players in TABLE_SIZES for r in game_benchmarks(players, iterations)],
+    "evaluate": evaluator_benchmarks,
+    "equity": equity_benchmarks,
+    "selfplay": selfplay_benchmarks,
+}
+
+
+def run(suites: Sequence[str], iterations: int = DEFAULT_ITERATIONS, seed: int = 0) -> Dict:
+    random.seed(seed)       # Game.shuffle_cards
+    np.random.seed(seed)
+    results = []
+    for suite in suites:
+        for result in SUITES[suite](iterations):
+            print("%-36s %12.0f ops/s  p50 %9.2fus  p99 %9.2fus" % (result["name"], result["ops_per_sec"],
+                                                                  result["p50_us"], result["p99_us"]))
+            results.append(result)
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> List[str]:     # Names that regressed against a saved run
+    with open(baseline_path) as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    regressions = []
+    for result in report["results"]:
+        old: Optional[Dict] = baseline.get(result["name"])
+        if old is not None and result["p50_us"] > old["p50_us"] * (1 + tolerance):
+            regressions.append("%s: p50 %.2fus -> %.2fus" % (result["name"], old["p50_us"], result["p50_us"]))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the poker engine hot paths")
+    parser.add_argument("--only", default=",".join(SUITES), help="Comma separated suites: " + ",".join(SUITES))
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    parser.add_argument("--compare", default=None, help="Baseline JSON from an earlier --out")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 slowdown against the baseline")
+    args = parser.parse_args()
+
+    report = run(args.only.split(","), args.iterations, args.seed)
+    if args.out is not None:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare is not None:
+        regressions = compare(report, args.compare, args.tolerance)
+        for line in regressions:
+            print("REGRESSION %s" % line)
+        if regressions:
+            raise SystemExit(1)
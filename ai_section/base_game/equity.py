@@ -0,0 +1,189 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import evaluator
+
+'''
+Vectorized Monte Carlo equity engine.
+
+Random runouts are dealt and evaluated as whole NumPy batches instead of one
+rollout at a time:
+1. Shuffle the unseen cards for every rollout in the batch at once (argsort of random keys)
+2. Slice off the missing community cards and two hole cards per opponent
+3. Evaluate every 7 card hand in the batch with the evaluator's lookup tables
+4. Hero scores 1 for a win, 1/k for a k-way tie and 0 for a loss
+
+Cards are the evaluator's int encoding (see evaluator.py / Card.to_int()).
+
+ParallelEquity spreads the rollouts over a reusable process pool. The work is
+cut into fixed size chunks and chunk i always gets child i of the master
+SeedSequence, so a result only depends on the master seed and the number of
+decisions made so far, not on how many workers there are.
+'''
+
+FLUSH_TABLE = np.array(evaluator.FLUSH_LOOKUP, dtype=np.int16)
+_UNSUITED_KEYS = np.array(sorted(evaluator.UNSUITED_LOOKUP), dtype=np.int64)
+_UNSUITED_RANKS = np.array([evaluator.UNSUITED_LOOKUP[key] for key in _UNSUITED_KEYS.tolist()], dtype=np.int16)
+
+DEFAULT_BATCH_SIZE = 2048
+Z_95 = 1.96
+
+
+class EquityResult(NamedTuple):
+    equity: float       # Expected share of the pot, 0-1
+    low: float          # Lower bound of the confidence interval
+    high: float         # Upper bound of the confidence interval
+    samples: int        # Number of runouts evaluated
+    elapsed: float      # Seconds spent simulating
+
+
+def evaluate_batch(hands: np.ndarray) -> np.ndarray:      # (n, 5-7) encoded cards -> (n,) hand ranks
+    hands = np.asarray(hands, dtype=np.int64)
+    product = np.prod(hands & 0xFF, axis=1)
+    ranks = _UNSUITED_RANKS[np.searchsorted(_UNSUITED_KEYS, product)]
+    for bit in (0x1000, 0x2000, 0x4000, 0x8000):
+        suited = (hands & bit) != 0
+        is_flush = suited.sum(axis=1) >= 5
+        if is_flush.any():
+            mask = np.bitwise_or.reduce(np.where(suited[is_flush], hands[is_flush] >> 16, 0), axis=1)
+            ranks[is_flush] = FLUSH_TABLE[mask]
+    return ranks
+
+
+def _unseen(known: Sequence[int]) -> np.ndarray:
+    known = set(known)
+    return np.array([card for card in evaluator.FULL_DECK if card not in known], dtype=np.int64)
+
+
+def simulate(hole: Sequence[int], board: Sequence[int], num_opponents: int,
+             samples: int, rng: np.random.Generator) -> Tuple[float, float]:
+    # Runs `samples` rollouts, returns the sum of hero's pot shares and the sum of their squares
+    deck = _unseen(list(hole) + list(board))
+    missing = 5 - len(board)
+    needed = missing + 2 * num_opponents
+
+    order = np.argsort(rng.random((samples, len(deck))), axis=1)[:, :needed]
+    dealt = deck[order]
+    runout = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int64), (samples, len(board))),
+                             dealt[:, :missing]], axis=1)
+
+    hero = evaluate_batch(np.concatenate([np.broadcast_to(np.array(hole, dtype=np.int64), (samples, 2)), runout], axis=1))
+
+    opponent_holes = dealt[:, missing:].reshape(samples, num_opponents, 2)
+    opponent_boards = np.broadcast_to(runout[:, None, :], (samples, num_opponents, 5))
+    opponents = evaluate_batch(np.concatenate([opponent_holes, opponent_boards], axis=2).reshape(-1, 7))
+    opponents = opponents.reshape(samples, num_opponents)
+
+    best = opponents.min(axis=1)
+    ties = (opponents == best[:, None]).sum(axis=1)
+    share = np.where(hero < best, 1.0, np.where(hero == best, 1.0 / (ties + 1), 0.0))
+    return float(share.sum()), float(np.square(share).sum())
+
+
+def summarise(total: float, total_sq: float, n: int, elapsed: float) -> EquityResult:
+    mean = total / n
+    variance = max(total_sq / n - mean * mean, 0.0)
+    margin = Z_95 * (variance / n) ** 0.5
+    return EquityResult(mean, max(0.0, mean - margin), min(1.0, mean + margin), n, elapsed)
+
+
+def _validate(hole: Sequence[int], board: Sequence[int], num_opponents: int) -> None:
+    if len(hole) != 2 or len(board) > 5 or num_opponents < 1:
+        raise ValueError("Need 2 hole cards, at most 5 board cards and at least 1 opponent")
+    if len(set(hole) | set(board)) != len(hole) + len(board):
+        raise ValueError("Duplicate cards in hole/board")
+
+
+def _run(hole: Sequence[int], board: Sequence[int], num_opponents: int, samples: int,
+         batch_size: int, rng: np.random.Generator, deadline: Optional[float]) -> Tuple[float, float, int]:
+    # Simulates in batches until `samples` is reached or the wall clock passes `deadline`
+    total = total_sq = 0.0
+    n = 0
+    while n < samples:
+        batch = min(batch_size, samples - n)
+        batch_total, batch_sq = simulate(hole, board, num_opponents, batch, rng)
+        total += batch_total
+        total_sq += batch_sq
+        n += batch
+        if deadline is not None and time.time() >= deadline:
+            break
+    return total, total_sq, n
+
+
+def equity(hole: Sequence[int], board: Sequence[int] = (), num_opponents: int = 1,
+           samples: int = 20000, time_budget: Optional[float] = None,
+           batch_size: int = DEFAULT_BATCH_SIZE, seed: Optional[int] = None) -> EquityResult:
+    '''
+    Estimates hero's equity against `num_opponents` random hands.
+    Stops after `samples` rollouts, or earlier once `time_budget` seconds have been spent.
+    '''
+    _validate(hole, board, num_opponents)
+    start = time.time()
+    deadline = None if time_budget is None else start + time_budget
+    total, total_sq, n = _run(hole, board, num_opponents, samples, batch_size, np.random.default_rng(seed), deadline)
+    return summarise(total, total_sq, n, time.time() - start)
+
+
+def _worker(hole, board, num_opponents, samples, batch_size, seed_seq, deadline, first=True):     # Runs one chunk in a pool process
+    if not first and deadline is not None and time.time() >= deadline:      # Chunks queued past the deadline are skipped
+        return 0.0, 0.0, 0
+    return _run(hole, board, num_opponents, samples, batch_size, np.random.default_rng(seed_seq), deadline)
+
+
+class ParallelEquity:
+    '''
+    Process pool equity calculator, create it once and reuse it for every decision.
+
+        with ParallelEquity(seed=42) as engine:
+            result = engine.equity(hole, board, num_opponents=3, time_budget=0.5)
+    '''
+    def __init__(self, workers: Optional[int] = None, seed: Optional[int] = None,
+                 chunk_size: int = 8 * DEFAULT_BATCH_SIZE) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.seed_seq = np.random.SeedSequence(seed)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        self.warm_up()
+
+    def warm_up(self) -> None:      # Starts every worker and builds its lookup tables now rather than on the first decision
+        hole = evaluator.FULL_DECK[:2]
+        futures = [self.pool.submit(_worker, hole, (), 1, 1, 1, None, None) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def equity(self, hole: Sequence[int], board: Sequence[int] = (), num_opponents: int = 1,
+               samples: int = 200000, time_budget: Optional[float] = None,
+               batch_size: int = DEFAULT_BATCH_SIZE) -> EquityResult:
+        _validate(hole, board, num_opponents)
+        hole, board = tuple(hole), tuple(board)
+        start = time.time()
+        deadline = None if time_budget is None else start + time_budget
+
+        chunks: List[int] = [self.chunk_size] * (samples // self.chunk_size)
+        if samples % self.chunk_size:
+            chunks.append(samples % self.chunk_size)
+        seeds = self.seed_seq.spawn(len(chunks))
+
+        futures = [self.pool.submit(_worker, hole, board, num_opponents, chunk, batch_size, seeds[i], deadline, i == 0)
+                   for i, chunk in enumerate(chunks)]
+        total = total_sq = 0.0
+        n = 0
+        for future in futures:
+            chunk_total, chunk_sq, chunk_n = future.result()
+            total += chunk_total
+            total_sq += chunk_sq
+            n += chunk_n
+        return summarise(total, total_sq, n, time.time() - start)
+
+    def close(self) -> None:
+        self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
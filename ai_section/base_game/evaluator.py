@@ -0,0 +1,200 @@
+from itertools import combinations, combinations_with_replacement
+from math import prod
+from typing import Dict, List, Sequence, Tuple
+
+'''
+Bit-packed card encoding and lookup-table hand evaluator.
+
+Each card is a single 32 bit int (Cactus Kev layout):
+
+    +--------+--------+--------+--------+
+    |xxxbbbbb|bbbbbbbb|cdhsrrrr|xxpppppp|
+    +--------+--------+--------+--------+
+
+    p = prime number of rank (deuce=2, trey=3, ..., ace=41)
+    r = rank index (deuce=0, trey=1, ..., ace=12)
+    cdhs = suit bit (only one set)
+    b = rank bit (only one set)
+
+Hands are ranked into the 7462 distinct poker hand classes, 1 being a royal
+flush and 7462 being 7-5-4-3-2 unsuited, so a lower rank is a better hand.
+
+Evaluating 5, 6 or 7 cards is:
+1. Check for a flush by OR-ing the rank bits of each suit, a hit is a lookup in FLUSH_LOOKUP
+2. Otherwise multiply the primes together and look the product up in UNSUITED_LOOKUP
+'''
+
+RANK_CHARS = "23456789TJQKA"
+SUIT_CHARS = "shdc"
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+SUIT_BITS = {"s": 0x1000, "h": 0x2000, "d": 0x4000, "c": 0x8000}
+
+# Hand categories, best first
+STRAIGHT_FLUSH = 0
+FOUR_OF_A_KIND = 1
+FULL_HOUSE = 2
+FLUSH = 3
+STRAIGHT = 4
+THREE_OF_A_KIND = 5
+TWO_PAIR = 6
+ONE_PAIR = 7
+HIGH_CARD = 8
+
+CATEGORY_NAMES = (
+    "Straight Flush",
+    "Four of a Kind",
+    "Full House",
+    "Flush",
+    "Straight",
+    "Three of a Kind",
+    "Two Pair",
+    "One Pair",
+    "High Card",
+)
+
+WORST_RANK = 7462
+
+
+def encode(rank: int, suit: str) -> int:      # rank index 0-12 (2-A), suit is one of "shdc"
+    return (1 << (16 + rank)) | SUIT_BITS[suit] | (rank << 8) | PRIMES[rank]
+
+
+def decode(card: int) -> Tuple[int, str]:     # Inverse of encode
+    rank = (card >> 8) & 0xF
+    for suit, bit in SUIT_BITS.items():
+        if card & bit:
+            return rank, suit
+    raise ValueError("Invalid card encoding: %d" % card)
+
+
+def card_from_string(string: str) -> int:    # "As", "Td", "2c" etc.
+    return encode(RANK_CHARS.index(string[0].upper()), string[1].lower())
+
+
+def card_to_string(card: int) -> str:
+    rank, suit = decode(card)
+    return RANK_CHARS[rank] + suit
+
+
+FULL_DECK: Tuple[int, ...] = tuple(encode(rank, suit) for suit in SUIT_CHARS for rank in range(13))
+
+
+def _straight_high(mask: int) -> int:          # Highest rank of a straight in a 13 bit rank mask, -1 if none
+    for high in range(12, 3, -1):
+        window = 0x1F << (high - 4)
+        if mask & window == window:
+            return high
+    if mask & 0x100F == 0x100F:                 # Wheel, A-2-3-4-5
+        return 3
+    return -1
+
+
+def _top_bits(mask: int, n: int) -> Tuple[int, ...]:     # Highest n ranks set in a mask, high to low
+    ranks = []
+    for rank in range(12, -1, -1):
+        if mask >> rank & 1:
+            ranks.append(rank)
+            if len(ranks) == n:
+                break
+    return tuple(ranks)
+
+
+def _flush_key(mask: int) -> Tuple:            # Best hand from the ranks of a single suit
+    high = _straight_high(mask)
+    if high >= 0:
+        return (STRAIGHT_FLUSH, high)
+    return (FLUSH,) + _top_bits(mask, 5)
+
+
+def _unsuited_key(counts: Sequence[int]) -> Tuple:     # Best non-flush hand from per-rank counts
+    ranks = range(12, -1, -1)
+    mask = 0
+    for rank in ranks:
+        if counts[rank]:
+            mask |= 1 << rank
+
+    quads = [r for r in ranks if counts[r] >= 4]
+    trips = [r for r in ranks if counts[r] == 3]
+    pairs = [r for r in ranks if counts[r] == 2]
+
+    if quads:
+        q = quads[0]
+        return (FOUR_OF_A_KIND, q, _top_bits(mask & ~(1 << q), 1)[0])
+    if trips and (len(trips) > 1 or pairs):
+        t = trips[0]
+        p = max(trips[1:] + pairs)
+        return (FULL_HOUSE, t, p)
+    high = _straight_high(mask)
+    if high >= 0:
+        return (STRAIGHT, high)
+    if trips:
+        t = trips[0]
+        return (THREE_OF_A_KIND, t) + _top_bits(mask & ~(1 << t), 2)
+    if len(pairs) >= 2:
+        p1, p2 = pairs[0], pairs[1]
+        return (TWO_PAIR, p1, p2) + _top_bits(mask & ~(1 << p1) & ~(1 << p2), 1)
+    if pairs:
+        p = pairs[0]
+        return (ONE_PAIR, p) + _top_bits(mask & ~(1 << p), 3)
+    return (HIGH_CARD,) + _top_bits(mask, 5)
+
+
+def _sort_key(key: Tuple) -> Tuple:             # Orders hand keys best first
+    return (key[0],) + tuple(-r for r in key[1:])
+
+
+def _build_tables() -> Tuple[List[int], Dict[int, int], List[Tuple]]:
+    # Every distinct 5 card hand class, ordered best to worst
+    keys = set()
+    for ranks in combinations(range(13), 5):
+        mask = sum(1 << r for r in ranks)
+        keys.add(_flush_key(mask))
+    for ranks in combinations_with_replacement(range(13), 5):
+        counts = [0] * 13
+        for r in ranks:
+            counts[r] += 1
+        if max(counts) <= 4:
+            keys.add(_unsuited_key(counts))
+    ordered = sorted(keys, key=_sort_key)
+    key_to_rank = {key: i + 1 for i, key in enumerate(ordered)}
+
+    # Flush lookup indexed by the 13 bit rank mask of the flush suit
+    flush_lookup = [0] * 8192
+    for mask in range(8192):
+        if bin(mask).count("1") >= 5:
+            flush_lookup[mask] = key_to_rank[_flush_key(mask)]
+
+    # Non-flush lookup keyed by the prime product of 5, 6 or 7 ranks
+    unsuited_lookup = {}
+    for n in (5, 6, 7):
+        for ranks in combinations_with_replacement(range(13), n):
+            counts = [0] * 13
+            for r in ranks:
+                counts[r] += 1
+            if max(counts) <= 4:
+                unsuited_lookup[prod(PRIMES[r] for r in ranks)] = key_to_rank[_unsuited_key(counts)]
+
+    return flush_lookup, unsuited_lookup, ordered
+
+
+FLUSH_LOOKUP, UNSUITED_LOOKUP, HAND_CLASSES = _build_tables()
+
+
+def evaluate(cards: Sequence[int]) -> int:     # Rank of the best 5 card hand within 5-7 encoded cards
+    suits = [c & 0xF000 for c in cards]
+    for bit in (0x1000, 0x2000, 0x4000, 0x8000):
+        if suits.count(bit) >= 5:
+            mask = 0
+            for c in cards:
+                if c & bit:
+                    mask |= c
+            return FLUSH_LOOKUP[mask >> 16]
+    return UNSUITED_LOOKUP[prod(c & 0xFF for c in cards)]
+
+
+def category(rank: int) -> int:                # Hand category (STRAIGHT_FLUSH ... HIGH_CARD) of a rank
+    return HAND_CLASSES[rank - 1][0]
+
+
+def describe(rank: int) -> str:
+    return CATEGORY_NAMES[category(rank)]
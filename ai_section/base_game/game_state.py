@@ -0,0 +1,162 @@
+from array import array
+from enum import IntEnum
+from typing import List, Sequence
+
+'''
+Compact, undoable game state for search and simulation.
+
+Everything per seat lives in flat arrays (wallets, stakes, active flags, hole
+cards) and the rest is a handful of ints, so a state is small and cheap to
+branch. Every applied action is pushed as an ActionRecord holding the values
+it overwrote, which makes undo() O(1): pop the record and write them back.
+Nothing is ever deep-copied.
+
+    marker = state.snapshot()
+    state.apply(ActionType.RAISE, 20)
+    state.apply(ActionType.CALL)
+    state.rollback(marker)        # Back to exactly where we were
+
+Betting follows Game.process_turn: a raise adds `amount` on top of the
+player's stake and resets the progress count, a check or call advances it,
+and once every other active player has acted the round moves on.
+'''
+
+
+class ActionType(IntEnum):
+    CHECK = 0
+    CALL = 1
+    RAISE = 2
+    FOLD = 3
+
+
+class ActionRecord:
+    __slots__ = ("kind", "seat", "amount", "prev_wallet", "prev_stake", "prev_pot",
+                 "prev_highest", "prev_progress", "prev_round", "prev_cur_player")
+
+    def __init__(self, kind: ActionType, seat: int, amount: int, prev_wallet: int, prev_stake: int, prev_pot: int,
+                 prev_highest: int, prev_progress: int, prev_round: int, prev_cur_player: int) -> None:
+        self.kind = kind
+        self.seat = seat
+        self.amount = amount
+        self.prev_wallet = prev_wallet
+        self.prev_stake = prev_stake
+        self.prev_pot = prev_pot
+        self.prev_highest = prev_highest
+        self.prev_progress = prev_progress
+        self.prev_round = prev_round
+        self.prev_cur_player = prev_cur_player
+
+    def __repr__(self) -> str:
+        return "%s(seat=%d, amount=%d)" % (self.kind.name, self.seat, self.amount)
+
+
+class GameState:
+    __slots__ = ("num_players", "wallets", "stakes", "active", "hole_cards", "community",
+                 "pot", "highest", "cur_player", "progress_count", "round", "history")
+
+    def __init__(self, wallets: Sequence[int], hole_cards: Sequence[int] = (), community: Sequence[int] = ()) -> None:
+        self.num_players = len(wallets)
+        self.wallets = array("q", wallets)
+        self.stakes = array("q", [0] * self.num_players)
+        self.active = array("b", [1] * self.num_players)
+        self.hole_cards = array("i", hole_cards or [0] * 2 * self.num_players)    # Seat i holds [2i, 2i+1]
+        self.community = array("i", community or [0] * 5)                         # Encoded cards, 0 if unknown
+        self.pot = 0
+        self.highest = 0
+        self.cur_player = 0
+        self.progress_count = 0
+        self.round = 0
+        self.history: List[ActionRecord] = []
+
+    @classmethod
+    def from_game(cls, game):      # Compact copy of a new.Game
+        state = cls([player.wallet for player in game.players],
+                     [code for player in game.players     # [0, 0] for a player without hole cards keeps later seats aligned
+                      for code in ([card.to_int() for card in player.hand] if len(player.hand) == 2 else [0, 0])],
+                     [card.to_int() if card.public else 0 for card in game.community_cards])     # Face-down cards stay unknown
+        for seat, player in enumerate(game.players):
+            state.stakes[seat] = player.stake or 0
+        state.pot = game.game_pot
+        state.highest = max(state.stakes, default=0)
+        state.cur_player = game.cur_player
+        state.progress_count = game.progress_count
+        state.round = game.round
+        return state
+
+    def active_count(self) -> int:
+        return sum(self.active)
+
+    def is_finished(self) -> bool:
+        return self.round >= 4 or self.active_count() <= 1
+
+    def to_call(self, seat: int) -> int:
+        return self.highest - self.stakes[seat]
+
+    def apply(self, kind: ActionType, amount: int = 0) -> int:     # Current player acts, returns -1 if the action is not allowed
+        seat = self.cur_player
+        wallet = self.wallets[seat]
+        stake = self.stakes[seat]
+
+        if kind == ActionType.CHECK:
+            if stake < self.highest:
+                return -1
+            amount = 0
+        elif kind == ActionType.CALL:
+            amount = self.highest - stake
+            if wallet < amount:
+                return -1
+        elif kind == ActionType.RAISE:
+            if amount <= 0 or wallet < amount:
+                return -1
+        elif kind == ActionType.FOLD:
+            amount = 0
+        else:
+            return -1
+
+        self.history.append(ActionRecord(kind, seat, amount, wallet, stake, self.pot, self.highest,
+                                         self.progress_count, self.round, self.cur_player))
+
+        if kind == ActionType.FOLD:
+            self.active[seat] = 0
+        else:
+            self.wallets[seat] = wallet - amount
+            self.stakes[seat] = stake + amount
+            self.pot += amount
+            if kind == ActionType.RAISE:
+                self.highest = max(self.highest, stake + amount)
+                self.progress_count = 0
+            else:
+                self.progress_count += 1
+
+        if self.progress_count >= self.active_count() - 1:
+            self.round += 1
+            self.progress_count = 0
+        self.cur_player = self.next_seat(seat)
+        return 0
+
+    def next_seat(self, seat: int) -> int:
+        for step in range(1, self.num_players + 1):
+            candidate = (seat + step) % self.num_players
+            if self.active[candidate]:
+                return candidate
+        return seat
+
+    def undo(self) -> ActionRecord:      # Reverts the last action in O(1)
+        record = self.history.pop()
+        seat = record.seat
+        self.wallets[seat] = record.prev_wallet
+        self.stakes[seat] = record.prev_stake
+        self.active[seat] = 1
+        self.pot = record.prev_pot
+        self.highest = record.prev_highest
+        self.progress_count = record.prev_progress
+        self.round = record.prev_round
+        self.cur_player = record.prev_cur_player
+        return record
+
+    def snapshot(self) -> int:       # Marker to roll back to, just the history length
+        return len(self.history)
+
+    def rollback(self, marker: int) -> None:
+        while len(self.history) > marker:
+            self.undo()
@@ -0,0 +1,65 @@
+from typing import Iterable, List, Optional
+
+import evaluator
+
+'''
+Incremental hand evaluation state for one player.
+
+Instead of re-evaluating hole + board from scratch every street, the state
+keeps the running prime product and the per-suit rank masks of the cards
+seen so far. Revealing a community card folds just that card in (one
+multiply, one OR) and the best-hand rank is then a single table lookup, so
+by the river the showdown rank is already known.
+'''
+
+SUIT_INDEX = {0x1000: 0, 0x2000: 1, 0x4000: 2, 0x8000: 3}
+
+
+class HandState:
+    def __init__(self, cards: Iterable[int] = ()) -> None:
+        self.cards: List[int] = []
+        self.product = 1                  # Product of the rank primes
+        self.suit_masks = [0, 0, 0, 0]    # 13 bit rank mask per suit
+        self.suit_counts = [0, 0, 0, 0]
+        self.rank: Optional[int] = None   # Best hand rank once 5+ cards are known
+        self._outs: Optional[List[int]] = None
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: int) -> None:    # Fold one newly seen card into the state
+        suit = SUIT_INDEX[card & 0xF000]
+        self.cards.append(card)
+        self.product *= card & 0xFF
+        self.suit_masks[suit] |= card >> 16
+        self.suit_counts[suit] += 1
+        self._outs = None
+        if len(self.cards) >= 5:
+            self.rank = self._lookup(self.product, self.suit_masks, self.suit_counts)
+
+    @staticmethod
+    def _lookup(product, suit_masks, suit_counts) -> int:
+        for suit in range(4):
+            if suit_counts[suit] >= 5:
+                return evaluator.FLUSH_LOOKUP[suit_masks[suit]]
+        return evaluator.UNSUITED_LOOKUP[product]
+
+    def rank_with(self, card: int) -> int:    # Rank if `card` were added, without changing the state
+        suit = SUIT_INDEX[card & 0xF000]
+        masks = list(self.suit_masks)
+        counts = list(self.suit_counts)
+        masks[suit] |= card >> 16
+        counts[suit] += 1
+        return self._lookup(self.product * (card & 0xFF), masks, counts)
+
+    def category(self) -> Optional[int]:
+        return None if self.rank is None else evaluator.category(self.rank)
+
+    def outs(self, unseen: Iterable[int]) -> List[int]:
+        # Unseen cards that would lift the hand into a better category on the next street, cached until the next add()
+        if self._outs is None:
+            if self.rank is None or len(self.cards) >= 7:
+                self._outs = []
+            else:
+                current = evaluator.category(self.rank)
+                self._outs = [card for card in unseen if evaluator.category(self.rank_with(card)) < current]
+        return self._outs
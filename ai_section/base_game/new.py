@@ -1,4 +1,10 @@
-from typing import List, Set, Dict, Tuple, Type
+from typing import List, Set, Dict, Optional, Tuple, Type
+import random
+import evaluator
+import equity
+import preflop
+from hand_state import HandState
+from game_state import ActionType, GameState
 
 '''
 Initialization:
@@ -19,9 +25,12 @@ Check, raise, raise - call, call, skip - end
 When ended, advance to next round
 '''
 
+DEFAULT_CASH = 1000
+
 class Game:                          # Game object
-    def __init__(self) -> None:
-        self.deck = full_deck
+    def __init__(self, rng: Optional[random.Random] = None) -> None:     # rng shuffles the deck, the random module if None
+        self.rng = rng or random
+        self.deck = list(full_deck)
         self.community_cards: List[Type[Card]] = []
         self.players: List[Type[Player]] = []
         self.actions: List[Type[Action]] = []            # History of actions throughout the game
@@ -31,30 +40,127 @@ class Game:                          # Game object
         self.progress_count = 0
         self.fold_count = 0
         self.round = 0
+        self.preflop_table = preflop.load_table()     # Memory-mapped preflop equities, None if not built
+        self.hand_states: Dict[int, HandState] = {}   # Incremental hand evaluation per player id
+        self.showdown_winners: List[Type[Player]] = []
         
-    def deal():                      # Cards from deck are assigned, 2 to each player and the 5 community cards are dealt (face down)
-        pass
+    def reset_hand(self):            # Clears everything from the last hand, keeping the players and their wallets
+        self.community_cards = []
+        self.actions = []
+        self.call_amount = -1
+        self.game_pot = 0
+        self.cur_player = 0
+        self.progress_count = 0
+        self.fold_count = 0
+        self.round = 0
+        self.hand_states = {}
+        self.showdown_winners = []
+        for player in self.players:
+            player.stake = 0
+            player.hand = ()
+
+    def deal(self):                  # Cards from deck are assigned, 2 to each player and the 5 community cards are dealt (face down)
+        self.shuffle_cards()
+        for player in self.players:
+            player.hand = (self.draw_card(), self.draw_card())
+        self.community_cards = [self.draw_card() for _ in range(5)]
+        self.hand_states = {player.id: HandState([card.to_int() for card in player.hand]) for player in self.players}
+
+    def reveal_community(self, start, end):     # Flips community cards [start:end] and folds only those into each hand state
+        for card in self.community_cards[start:end]:
+            if card.public:          # Already face up, e.g. read off the table by set_community
+                continue
+            code = card.to_int()
+            for player in self.players:
+                self.hand_state(player).add(code)       # A state built here from the face-up cards must not count this one yet
+            card.public = True
+
+    def set_community(self, cards):     # Replaces the first len(cards) community cards with the ones seen on the table, face up
+        if len(cards) > len(self.community_cards):
+            raise ValueError("Only %d community cards are dealt, got %d" % (len(self.community_cards), len(cards)))
+        for i, card in enumerate(cards):
+            current = self.community_cards[i]
+            if repr(current) != repr(card):
+                current.public = False      # Goes back face down, to the deck or to wherever card was dealt
+                drawn = self.draw_card(card)
+                if drawn is None:
+                    drawn = self.swap_dealt(card, current)
+                else:
+                    self.deck.append(current)       # The dealt card goes back, it was never on the table
+                self.community_cards[i] = current = drawn
+            current.public = True
+        self.hand_states = {}        # Rebuilt from the hole cards and face-up board on next use
+
+    def swap_dealt(self, card, replacement):     # Takes card from the board or a hand that was dealt it, leaving replacement face down there
+        for i, held in enumerate(self.community_cards):
+            if repr(held) == repr(card):
+                self.community_cards[i] = replacement
+                return held
+        for player in self.players:
+            for held in player.hand:
+                if repr(held) == repr(card):
+                    player.hand = tuple(replacement if other is held else other for other in player.hand)
+                    return held
+        raise ValueError("%r is neither in the deck nor dealt" % card)
+
+    def hand_state(self, player):     # Player's incremental hand state, built from their cards if missing
+        state = self.hand_states.get(player.id)
+        if state is None:
+            known = [card.to_int() for card in player.hand]
+            known += [card.to_int() for card in self.community_cards if card.public]
+            state = self.hand_states[player.id] = HandState(known)
+        return state
+
+    def hand_rank(self, player):      # Current best-hand rank (None before the flop)
+        return self.hand_state(player).rank
+
+    def outs(self, player):          # Unseen cards that improve the player's hand category on the next card
+        state = self.hand_state(player)
+        seen = set(state.cards)
+        return state.outs([card for card in evaluator.FULL_DECK if card not in seen])
     
     def get_pot():
         pass
     
-    def evaluate_hands():
-        pass
+    def evaluate_hands(self):        # Ranks each player's best hand at showdown, returns the winning player(s)
+        best = evaluator.WORST_RANK + 1
+        winners = []
+        for player in self.players:
+            rank = self.hand_state(player).rank     # Already final once the river has been revealed
+            if rank is None:        # Only face-up cards count, as everywhere else
+                board = [card.to_int() for card in self.community_cards if card.public]
+                rank = evaluator.evaluate([card.to_int() for card in player.hand] + board)
+            if rank < best:
+                best = rank
+                winners = [player]
+            elif rank == best:
+                winners.append(player)
+        return winners
+
+    def win_probability(self, player, samples=20000, time_budget=None, engine=None):    # Equity of player's hand against the rest of the table
+        board = [card.to_int() for card in self.community_cards if card.public]
+        hole = [card.to_int() for card in player.hand]
+        opponents = len(self.players) - 1
+        if not board and self.preflop_table is not None and opponents <= self.preflop_table.max_opponents:
+            return self.preflop_table.result(hole, opponents)
+        if engine is not None:      # Shared equity.ParallelEquity pool, kept alive between decisions
+            return engine.equity(hole, board, opponents, samples=samples, time_budget=time_budget)
+        return equity.equity(hole, board, opponents, samples=samples, time_budget=time_budget)
     
     def end_round(self):
         self.round += 1
         if self.round == 1:
             # send flop to kinematics
-            pass
+            self.reveal_community(0, 3)
         elif self.round == 2:
             # send turn to kinematics
-            pass
+            self.reveal_community(3, 4)
         elif self.round == 3:
             # send river to kinematics
-            pass
+            self.reveal_community(4, 5)
         elif self.round == 4:
             # do showdown
-            pass
+            self.showdown_winners = self.evaluate_hands()
         self.progress_count = 0
         
     
@@ -63,6 +169,8 @@ class Game:                          # Game object
             self.end_round()
         
     def process_turn(self, action: str, player, n=0):
+        if action.upper() in ActionType.__members__:
+            self.actions.append(Action(ActionType[action.upper()], getattr(player, "id", player), n))
         match action: 
             case "call":
                 self.progress_count += 1
@@ -74,13 +182,16 @@ class Game:                          # Game object
 
         
     
+    def to_state(self) -> GameState:     # Compact undoable copy for search/simulation
+        return GameState.from_game(self)
+
     def set_player(self, num):      # Input number of players from cv team (including player id)
         i = 0
         for id in range(num):
             self.add_player(id)
     
-    def add_player(self, id):
-        self.players.append(Player(id))
+    def add_player(self, id, init_cash=DEFAULT_CASH):
+        self.players.append(Player(id, init_cash))
         
     def check(self, player):    # Checks if player needs to stake
         highest_stake = 0
@@ -110,14 +221,16 @@ class Game:                          # Game object
     
     def call(self, player, highest_stake):      # Call
         change = highest_stake - player.stake
-        if self.wallet < change:
+        if player.wallet < change:
             return -1
-        self.game_pot += highest_stake - player.stake
+        player.wallet -= change
+        self.game_pot += change
         player.stake = highest_stake
         return 0
         
     def fold(self, player, showCards=False):        # Fold, remove players (may add an option to show cards)
         self.players.remove(player)
+        self.actions.append(Action(ActionType.FOLD, player.id))
         
     def startGame (self):
         #setup to start the game
@@ -128,12 +241,18 @@ class Game:                          # Game object
     
     def shuffle_cards(self):
         #shuffles the card deck
-        pass
+        self.deck = [Card(card.num, card.suit) for card in full_deck]     # Fresh cards so public flags don't carry over
+        self.rng.shuffle(self.deck)
 
     def draw_card(self, card=None):
         #draws card from the deck
         #if card provided, will draw that card from the deck
-        pass
+        if card is None:
+            return self.deck.pop()
+        for i, candidate in enumerate(self.deck):
+            if candidate.num == card.num and candidate.suit == card.suit:
+                return self.deck.pop(i)
+        return None
     
     def nextPlayer(self, player):
         #switches the current player to the next in queue
@@ -150,17 +269,29 @@ class Game:                          # Game object
 
 
 class Player:
+    __slots__ = ("id", "wallet", "stake", "hand")
+
     def __init__(self, id, init_cash) -> None: # Added ID for players
         self.id = id
         self.wallet = init_cash
         self.stake: bool = None
         self.hand: Tuple[Type[Card]] = ()
     
-class Action:
-    def __init__(self) -> None:
-        pass
-        
+class Action:       # Typed record of one betting action
+    __slots__ = ("kind", "player", "amount")
+
+    def __init__(self, kind: ActionType, player: int, amount: int = 0) -> None:
+        self.kind = kind
+        self.player = player      # Player id
+        self.amount = amount
+
+    def __repr__(self) -> str:
+        return "%s(player=%s, amount=%s)" % (self.kind.name, self.player, self.amount)
+
+
 class Card:
+    __slots__ = ("num", "suit", "public")
+
     def __init__(self, num: int, suit: str) -> None:
         self.num = num  # 1-10 is A-10, J: 11, Q:12, K:13
         self.suit = suit # Character representing the suit
@@ -172,6 +303,18 @@ class Card:
         if len(string) < 3:      # Ensures the output is always 3 characters long
             return "0" + string
         return string
+
+    def to_int(self) -> int:     # Bit-packed encoding used by the evaluator
+        rank = 12 if self.num == 1 else self.num - 2
+        return evaluator.encode(rank, self.suit)
+
+    @classmethod
+    def from_int(cls, code: int):
+        rank, suit = evaluator.decode(code)
+        return cls(1 if rank == 12 else rank + 2, suit)
+
+
+full_deck: List[Card] = [Card(num, suit) for suit in evaluator.SUIT_CHARS for num in range(1, 14)]
         
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+import argparse
+import os
+import struct
+from typing import Optional, Sequence
+
+import numpy as np
+
+import equity
+import evaluator
+
+'''
+Precomputed preflop equity table.
+
+There are only 169 distinct starting hands (13 pairs, 78 suited, 78 offsuit),
+so their equity against 1-9 random opponents is simulated once by the build
+step below and saved to preflop_equity.bin:
+
+    Header (16 bytes, little endian)
+        magic      4s   b"PFEQ"
+        version    H    1
+        classes    H    169
+        opponents  H    9, column j holds the equity against j+1 opponents
+        reserved   H    0
+        samples    I    rollouts per entry
+    Body
+        float32[classes][opponents], row = hand_class()
+
+The Game engine opens the body with numpy.memmap, so loading is just mapping
+the file and every lookup is a single index.
+
+Rebuild with:
+    python preflop.py --samples 50000 --workers 8
+'''
+
+MAGIC = b"PFEQ"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHI")
+NUM_CLASSES = 169
+MAX_OPPONENTS = 9
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.bin")
+
+
+def hand_class(hole: Sequence[int]) -> int:     # 0-168 index of two encoded hole cards in the 13x13 starting hand grid
+    rank1, suit1 = evaluator.decode(hole[0])
+    rank2, suit2 = evaluator.decode(hole[1])
+    high, low = max(rank1, rank2), min(rank1, rank2)
+    if suit1 == suit2:          # Suited above the diagonal, pairs on it, offsuit below
+        return high * 13 + low
+    return low * 13 + high
+
+
+def class_representative(index: int) -> tuple:     # A concrete pair of encoded cards for a hand class
+    row, col = divmod(index, 13)
+    if row > col:
+        return evaluator.encode(row, "s"), evaluator.encode(col, "s")
+    return evaluator.encode(row, "s"), evaluator.encode(col, "h")
+
+
+class PreflopTable:
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        with open(path, "rb") as f:
+            magic, version, classes, opponents, _, samples = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d preflop equity table" % (path, VERSION))
+        self.samples = samples
+        self.max_opponents = opponents
+        self.table = np.memmap(path, dtype="<f4", mode="r", offset=HEADER.size, shape=(classes, opponents))
+
+    def lookup(self, hole: Sequence[int], num_opponents: int) -> float:
+        if not 1 <= num_opponents <= self.max_opponents:
+            raise ValueError("Preflop table covers 1-%d opponents" % self.max_opponents)
+        return float(self.table[hand_class(hole), num_opponents - 1])
+
+    def result(self, hole: Sequence[int], num_opponents: int) -> equity.EquityResult:     # Lookup shaped like a Monte Carlo result
+        p = self.lookup(hole, num_opponents)
+        margin = equity.Z_95 * (p * (1 - p) / self.samples) ** 0.5
+        return equity.EquityResult(p, max(0.0, p - margin), min(1.0, p + margin), self.samples, 0.0)
+
+
+def load_table(path: str = DEFAULT_PATH) -> Optional[PreflopTable]:    # None if the table has not been built
+    if not os.path.exists(path):
+        return None
+    return PreflopTable(path)
+
+
+def build(path: str = DEFAULT_PATH, samples: int = 50000, workers: Optional[int] = None, seed: int = 0) -> None:
+    table = np.zeros((NUM_CLASSES, MAX_OPPONENTS), dtype="<f4")
+    with equity.ParallelEquity(workers=workers, seed=seed) as engine:
+        for index in range(NUM_CLASSES):
+            hole = class_representative(index)
+            for opponents in range(1, MAX_OPPONENTS + 1):
+                table[index, opponents - 1] = engine.equity(hole, (), opponents, samples=samples).equity
+            print("Preflop: %d/%d" % (index + 1, NUM_CLASSES))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, NUM_CLASSES, MAX_OPPONENTS, 0, samples))
+        f.write(table.tobytes())
+    os.replace(tmp_path, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the preflop equity table")
+    parser.add_argument("--out", default=DEFAULT_PATH)
+    parser.add_argument("--samples", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build(args.out, args.samples, args.workers, args.seed)
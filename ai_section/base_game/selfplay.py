@@ -0,0 +1,325 @@
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+import evaluator
+import new
+import preflop
+
+'''
+Headless self-play harness.
+
+Drives new.Game through whole hands without the vision stack or a keyboard:
+1. Rebuy anyone who cannot cover the big blind, reset the hand and deal
+2. Post the blinds, then ask each seat's policy for an action until the round
+   ends (Game.check_end_of_round) or everyone else has folded
+3. Flop, turn and river come from Game.end_round, the showdown from
+   Game.evaluate_hands, and the pot is split between the winners
+
+Every hand checks that no chips were created or lost, so a bug in the betting
+code shows up as an AssertionError instead of a wrong stack at the table.
+
+Policies are plain classes with an act(view, rng) method returning
+(action, amount), registered by name in POLICIES so they can be sent to
+worker processes. run_parallel() spreads games over a process pool, game i
+always gets child i of the master SeedSequence so results only depend on the
+seed.
+
+    python selfplay.py --hands 20000 --players 6 --policies random,strength --workers 4
+'''
+
+DEFAULT_BLINDS = (5, 10)
+MAX_RAISES = 3          # Raises allowed per betting round, keeps every hand finite
+
+
+class TableView(NamedTuple):       # What a policy sees when it is its turn
+    seat: int
+    round: int           # 0 preflop, 1 flop, 2 turn, 3 river
+    hole: Tuple[int, int]
+    board: Tuple[int, ...]
+    rank: Optional[int]  # Current best-hand rank, None before the flop
+    pot: int
+    to_call: int
+    wallet: int
+    opponents: int
+    big_blind: int
+    legal: Tuple[str, ...]
+
+
+class RandomPolicy:       # Uniform over the legal actions, raises one to three big blinds
+    def act(self, view: TableView, rng: random.Random) -> Tuple[str, int]:
+        action = rng.choice(view.legal)
+        if action == "raise":
+            return action, raise_amount(view, rng.randint(1, 3))
+        return action, 0
+
+
+class CallPolicy:         # Calling station, never raises or folds
+    def act(self, view: TableView, rng: random.Random) -> Tuple[str, int]:
+        return ("check" if "check" in view.legal else "call" if "call" in view.legal else "fold"), 0
+
+
+class RaisePolicy:        # Raises whenever allowed
+    def act(self, view: TableView, rng: random.Random) -> Tuple[str, int]:
+        if "raise" in view.legal:
+            return "raise", raise_amount(view, 2)
+        return CallPolicy().act(view, rng)
+
+
+class StrengthPolicy:     # Bets by hand strength: preflop equity table, then hand category
+    def __init__(self) -> None:
+        self.table = preflop.load_table()
+
+    def strength(self, view: TableView) -> float:      # 0-1, higher is better
+        if view.rank is not None:
+            return 1.0 - evaluator.category(view.rank) / evaluator.HIGH_CARD
+        if self.table is not None and view.opponents <= self.table.max_opponents:
+            return self.table.lookup(view.hole, view.opponents) * (view.opponents + 1) / 2
+        ranks = sorted(evaluator.decode(card)[0] for card in view.hole)
+        return (ranks[0] == ranks[1]) * 0.5 + ranks[1] / 24
+
+    def act(self, view: TableView, rng: random.Random) -> Tuple[str, int]:
+        strength = self.strength(view)
+        if strength > 0.75 and "raise" in view.legal:
+            return "raise", raise_amount(view, 3 if strength > 0.9 else 1)
+        if view.to_call == 0:
+            return "check", 0
+        if strength > 0.4 or view.to_call <= view.big_blind:
+            return ("call" if "call" in view.legal else "fold"), 0
+        return "fold", 0
+
+
+POLICIES = {
+    "random": RandomPolicy,
+    "call": CallPolicy,
+    "raise": RaisePolicy,
+    "strength": StrengthPolicy,
+}
+
+
+def raise_amount(view: TableView, big_blinds: int) -> int:     # Chips to put in: the call plus `big_blinds` on top, capped at the wallet
+    return min(view.to_call + big_blinds * view.big_blind, view.wallet)
+
+
+class SelfPlayResult(NamedTuple):
+    hands: int
+    decisions: int
+    showdowns: int
+    rebuys: int
+    actions: Dict[str, int]     # Count per action name
+    winnings: List[int]         # Net chips per seat, rebuys excluded
+    elapsed: float              # Seconds spent playing
+
+    @property
+    def hands_per_second(self) -> float:
+        return self.hands / self.elapsed if self.elapsed else 0.0
+
+
+class SelfPlay:
+    '''
+    One table of bots playing hand after hand on a single Game.
+
+        table = SelfPlay(["random", "strength", "call"], seed=1)
+        result = table.run(10000)
+    '''
+    def __init__(self, policies: Sequence[str], stack: int = new.DEFAULT_CASH,
+                 blinds: Tuple[int, int] = DEFAULT_BLINDS, seed: Optional[int] = None,
+                 record: bool = False) -> None:
+        if len(policies) < 2:
+            raise ValueError("Need at least 2 players")
+        self.policies = [POLICIES[name]() for name in policies]
+        self.stack = stack
+        self.small_blind, self.big_blind = blinds
+        self.rng = random.Random(seed)
+
+        self.game = new.Game(random.Random(self.rng.getrandbits(64)))     # Own deck generator, the module level one is left alone
+        for seat in range(len(policies)):
+            self.game.add_player(seat, stack)
+        self.seats: List[new.Player] = list(self.game.players)
+        self.button = 0
+        self.record = record
+        self.records: List[dict] = []       # One row per decision when `record` is set
+
+        self.hands = self.decisions = self.showdowns = self.rebuys = 0
+        self.action_counts = {"check": 0, "call": 0, "raise": 0, "fold": 0}
+        self.buy_ins = [stack] * len(self.seats)
+
+    def legal_actions(self, player, to_call: int, raises: int) -> Tuple[str, ...]:
+        legal = ["fold"]
+        if to_call == 0:
+            legal.append("check")
+        elif player.wallet >= to_call:
+            legal.append("call")
+        if raises < MAX_RAISES and player.wallet > to_call:
+            legal.append("raise")
+        return tuple(legal)
+
+    def view(self, player, to_call: int, raises: int) -> TableView:
+        game = self.game
+        return TableView(player.id, game.round, tuple(card.to_int() for card in player.hand),
+                         tuple(card.to_int() for card in game.community_cards if card.public),
+                         game.hand_rank(player), game.game_pot, to_call, player.wallet,
+                         len(game.players) - 1, self.big_blind, self.legal_actions(player, to_call, raises))
+
+    def play_hand(self) -> None:
+        game = self.game
+        for player in self.seats:
+            if player.wallet < self.big_blind:
+                self.buy_ins[player.id] += self.stack - player.wallet
+                player.wallet = self.stack
+                self.rebuys += 1
+        chips = sum(player.wallet for player in self.seats)
+
+        order = self.seats[self.button:] + self.seats[:self.button]     # Small blind first
+        self.button = (self.button + 1) % len(self.seats)
+        game.players = list(order)
+        game.reset_hand()
+        game.deal()
+        game.bet(order[0], self.small_blind)
+        game.bet(order[1], self.big_blind)
+        game.cur_player = 2 % len(order)
+
+        street, raises = game.round, 0
+        while len(game.players) > 1 and game.round < 4:
+            if game.round != street:        # New street, first player still in acts first
+                street, raises = game.round, 0
+                game.cur_player = 0
+            index = game.cur_player % len(game.players)
+            player = game.players[index]
+            highest = max(p.stake for p in game.players)
+            to_call = highest - player.stake
+            view = self.view(player, to_call, raises)
+            action, amount = self.policies[player.id].act(view, self.rng)
+            if action not in view.legal:
+                raise ValueError("Policy %s chose illegal action %s" % (type(self.policies[player.id]).__name__, action))
+
+            if self.record:
+                self.records.append({"hand": self.hands, "round": game.round, "seat": player.id, "hole": list(view.hole),
+                                     "board": list(view.board), "pot": view.pot, "to_call": to_call,
+                                     "wallet": player.wallet, "action": action, "amount": amount})
+            self.decisions += 1
+            self.action_counts[action] += 1
+
+            if action == "fold":
+                game.fold(player)
+                game.cur_player = index % len(game.players)
+            else:
+                if action == "call":
+                    game.call(player, highest)
+                elif action == "raise":
+                    raises += 1
+                    if amount <= to_call:
+                        raise ValueError("Raise of %d does not cover the %d to call" % (amount, to_call))
+                game.process_turn(action, player, amount)
+                game.cur_player = (index + 1) % len(game.players)
+            game.check_end_of_round()
+
+        if len(game.players) == 1:
+            winners = game.players
+        else:
+            winners = game.showdown_winners
+            self.showdowns += 1
+        share, remainder = divmod(game.game_pot, len(winners))
+        for i, winner in enumerate(winners):
+            winner.wallet += share + (i < remainder)
+        game.game_pot = 0
+
+        assert sum(player.wallet for player in self.seats) == chips, "Chips not conserved in hand %d" % self.hands
+        self.hands += 1
+
+    def run(self, hands: int, time_budget: Optional[float] = None) -> SelfPlayResult:
+        # Plays `hands` hands, or stops early once `time_budget` seconds have passed
+        start = time.time()
+        deadline = None if time_budget is None else start + time_budget
+        for _ in range(hands):
+            self.play_hand()
+            if deadline is not None and time.time() >= deadline:
+                break
+        return self.result(time.time() - start)
+
+    def result(self, elapsed: float) -> SelfPlayResult:
+        winnings = [player.wallet - self.buy_ins[player.id] for player in self.seats]
+        return SelfPlayResult(self.hands, self.decisions, self.showdowns, self.rebuys,
+                              dict(self.action_counts), winnings, elapsed)
+
+
+def merge(results: Sequence[SelfPlayResult], elapsed: float) -> SelfPlayResult:
+    actions: Dict[str, int] = {}
+    for result in results:
+        for name, count in result.actions.items():
+            actions[name] = actions.get(name, 0) + count
+    winnings = [sum(seat) for seat in zip(*(result.winnings for result in results))]
+    return SelfPlayResult(sum(r.hands for r in results), sum(r.decisions for r in results),
+                          sum(r.showdowns for r in results), sum(r.rebuys for r in results),
+                          actions, winnings, elapsed)
+
+
+def write_records(records: Sequence[dict], path: str) -> None:
+    with open(path, "w") as f:
+        for row in records:
+            f.write(json.dumps(row) + "\n")
+
+
+def _worker(policies, hands, stack, blinds, seed_seq, record_path):     # Plays one game in a pool process
+    seed = int(seed_seq.generate_state(1)[0])
+    table = SelfPlay(policies, stack, blinds, seed, record=record_path is not None)
+    result = table.run(hands)
+    if record_path is not None:
+        write_records(table.records, record_path)
+    return result
+
+
+def run_parallel(policies: Sequence[str], hands: int, games: int, workers: Optional[int] = None,
+                 stack: int = new.DEFAULT_CASH, blinds: Tuple[int, int] = DEFAULT_BLINDS,
+                 seed: Optional[int] = None, record_dir: Optional[str] = None) -> SelfPlayResult:
+    '''
+    Plays `games` independent tables of `hands` hands each across a process pool.
+    With `record_dir` set, each game writes its decisions to game_<i>.ndjson there.
+    '''
+    seeds = np.random.SeedSequence(seed).spawn(games)
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        futures = [pool.submit(_worker, list(policies), hands, stack, blinds, seeds[i],
+                               None if record_dir is None else os.path.join(record_dir, "game_%d.ndjson" % i))
+                   for i in range(games)]
+        results = [future.result() for future in futures]
+    return merge(results, time.time() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless bot self-play")
+    parser.add_argument("--hands", type=int, default=10000, help="Hands per game")
+    parser.add_argument("--players", type=int, default=6)
+    parser.add_argument("--policies", default="random", help="Comma separated, cycled over the seats: " + ",".join(POLICIES))
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--stack", type=int, default=new.DEFAULT_CASH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--record", default=None, help="Directory to write per-decision NDJSON training data")
+    args = parser.parse_args()
+
+    names = args.policies.split(",")
+    seat_policies = [names[i % len(names)] for i in range(args.players)]
+    if args.games == 1 and args.workers is None:
+        table = SelfPlay(seat_policies, args.stack, seed=args.seed, record=args.record is not None)
+        summary = table.run(args.hands)
+        if args.record is not None:
+            os.makedirs(args.record, exist_ok=True)
+            write_records(table.records, os.path.join(args.record, "game_0.ndjson"))
+    else:
+        summary = run_parallel(seat_policies, args.hands, args.games, args.workers, args.stack,
+                               seed=args.seed, record_dir=args.record)
+
+    print("Self-play: %d hands in %.2fs (%.0f hands/s)" % (summary.hands, summary.elapsed, summary.hands_per_second))
+    print("Decisions: %d, showdowns: %d, rebuys: %d" % (summary.decisions, summary.showdowns, summary.rebuys))
+    print("Actions: %s" % ", ".join("%s %d" % item for item in summary.actions.items()))
+    for seat, (name, chips) in enumerate(zip(seat_policies, summary.winnings)):
+        print("Seat %d (%s): %+d" % (seat, name, chips))
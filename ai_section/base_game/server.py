@@ -1,55 +1,329 @@
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import threading
 import time
 import new
+import evaluator
 import json
 import os
 from dotenv import load_dotenv
 
+'''
+Long-lived AI server the vision and arm clients post game events to.
+
+The Game no longer lives on the request handler (a new handler is built for
+every request, so every POST used to start from an empty game). Games are kept
+in the server's SessionStore, keyed by the "session" field of the message
+("default" if missing), and each session has its own lock so requests for
+different tables never wait on each other.
+
+Requests are served on a thread each (ThreadingHTTPServer) and the handler
+speaks HTTP/1.1, so a client keeps one connection open across actions.
+
+    POST /      {"type": "setPlayer", "player_count": 4}
+                {"type": "action", "action": "raise", "player": 2, "amount": 20}
+                {"type": "communityCards", "cards": ["Ah", "Td", "7c"]}
+    POST /batch application/x-ndjson, one message per line, or a JSON list
+    GET  /state?session=default
+
+communityCards reports the board cards read off the table, left to right; they
+replace the ones dealt for the hand and are turned face up.
+
+Every response is JSON: {"ok": true, "state": {...}} or {"ok": false, "error": "..."}.
+A session nobody has posted to for SESSION_IDLE_SECONDS is dropped, and the
+next message for it starts a new game.
+
+/batch applies its messages in order under a single session lock and
+replies once with the final state, so a burst of events from the vision side
+costs one round trip. The body may be sent with Transfer-Encoding: chunked,
+in which case lines are applied as they arrive. A bad message stops the batch
+there: the messages before it stay applied and "applied" says how many.
+A JSON list must be the whole body; anything after it rejects the batch.
+The session lock is held while a chunked body is still being read, so a slow
+streaming client holds up every other request for its session; each chunk
+must arrive within STREAM_READ_TIMEOUT seconds or the batch is answered with
+a 408 and the connection is closed.
+'''
+
 # Load the environment variables
 load_dotenv()
 
-AI_SERVER_URL = os.getenv("AI_SERVER_URL")
-temp_url = AI_SERVER_URL[AI_SERVER_URL.index('://')+3:]
-hostName = temp_url[:temp_url.index(':')]
-serverPort = int(temp_url[temp_url.index(':')+1:])
+AI_SERVER_URL = os.getenv("AI_SERVER_URL", "http://localhost:5000")
+hostName = urlparse(AI_SERVER_URL).hostname
+serverPort = urlparse(AI_SERVER_URL).port
 
-class ArmServer(BaseHTTPRequestHandler):
-    def __init__(self, request, client_address, server):
-        super().__init__(request, client_address, server)
+DEFAULT_SESSION = "default"
+SESSION_IDLE_SECONDS = 3600      # Sessions idle this long are dropped
+STREAM_READ_TIMEOUT = 5.0        # Longest wait for the next chunk of a streamed /batch
+END = object()
+
+
+class MalformedBody(Exception):      # The body itself cannot be read (e.g. a bad chunk size), as opposed to a bad message
+    pass
+
+
+class Session:
+    def __init__(self) -> None:
         self.game = new.Game()
-        
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header("Content-type","text/html")
+        self.lock = threading.Lock()
+        self.updated = time.time()
+
+
+class SessionStore:       # Games by session id, shared by every handler thread
+    def __init__(self, idle_seconds: float = SESSION_IDLE_SECONDS) -> None:
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.idle_seconds = idle_seconds
+        self.last_sweep = time.time()
+
+    def get(self, session_id: str) -> Session:
+        with self.lock:
+            now = time.time()
+            if now - self.last_sweep >= min(self.idle_seconds, 60):     # Expire idle sessions at most once a minute
+                self.last_sweep = now
+                for stale in [key for key, session in self.sessions.items() if now - session.updated >= self.idle_seconds]:
+                    del self.sessions[stale]
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = self.sessions[session_id] = Session()
+            return session
+
+
+def find_player(game, player_id):
+    for player in game.players:
+        if player.id == player_id:
+            return player
+    raise ValueError("No player with id %s" % player_id)
+
+
+def apply_message(game, message: dict) -> None:     # Applies one action/communityCards/setPlayer message, ValueError if it is invalid
+    if not isinstance(message, dict):
+        raise ValueError("A message must be a JSON object")
+    try:
+        apply_checked(game, message)
+    except (KeyError, TypeError) as e:      # Missing fields or fields of the wrong type, e.g. "amount": null
+        raise ValueError("Invalid message: %s %s" % (type(e).__name__, e))
+
+
+def apply_checked(game, message: dict) -> None:
+    match message.get("type"):
+        case "action":
+            action = message["action"]
+            player = find_player(game, message["player"])
+            amount = int(message.get("amount", 0))
+            match action:
+                case "fold":
+                    game.fold(player)
+                case "call":
+                    if game.call(player, max(p.stake or 0 for p in game.players)) == -1:
+                        raise ValueError("Player %s cannot afford to call" % player.id)
+                    game.process_turn(action, player, amount)
+                case "check":
+                    if game.check(player) == -1:
+                        raise ValueError("Player %s cannot check, they need to call" % player.id)
+                    game.process_turn(action, player, amount)
+                case "raise":
+                    to_call = max(p.stake or 0 for p in game.players) - (player.stake or 0)
+                    if amount <= 0 or amount <= to_call:
+                        raise ValueError("A raise must put in more than the %d needed to call, got %d" % (to_call, amount))
+                    if player.wallet < amount:
+                        raise ValueError("Player %s cannot afford a raise of %d" % (player.id, amount))
+                    game.process_turn(action, player, amount)
+                case _:
+                    raise ValueError("Unknown action %s" % action)
+            game.check_end_of_round()
+        case "communityCards":
+            cards = message["cards"]
+            if not isinstance(cards, list) or not all(isinstance(card, str) and len(card) == 2 for card in cards):
+                raise ValueError("cards must be a list of cards such as \"Ah\"")
+            if len(set(card.upper() for card in cards)) != len(cards):
+                raise ValueError("cards must not repeat a card")
+            try:
+                codes = [evaluator.card_from_string(card) for card in cards]
+            except (KeyError, ValueError):
+                raise ValueError("Unknown card in %s" % cards)
+            game.set_community([new.Card.from_int(code) for code in codes])
+        case "setPlayer":
+            game.players = []
+            game.set_player(int(message["player_count"]))
+            game.reset_hand()
+            game.deal()
+        case other:
+            raise ValueError("Unknown message type %s" % other)
+
+
+def game_state(game) -> dict:      # JSON view of a game, hole cards stay on the AI side
+    return {
+        "round": game.round,
+        "pot": game.game_pot,
+        "cur_player": game.cur_player,
+        "community_cards": [repr(card) for card in game.community_cards if card.public],
+        "players": [{"id": player.id, "wallet": player.wallet, "stake": player.stake} for player in game.players],
+        "winners": [player.id for player in game.showdown_winners],
+    }
+
+
+class ArmServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # Keep-alive, the client reuses its connection
+
+    def send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
         self.end_headers()
-        self.wfile.write(bytes("<html><head><title>Arm Server Page</title></head>", "utf-8"))
-        #self.wfile.write(bytes("<p>Request: %s</p>" %self.path, "utf-8"))
-        self.wfile.write(bytes("<body><p>This is the Arm Server.</p> </body>","utf-8"))
-        self.wfile.write(bytes("</html>","utf-8"))
-        
+        self.wfile.write(data)
+
+    def read_body(self) -> bytes:
+        content_length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(content_length)
+
+    def read_lines(self):      # Body lines as they arrive, chunked uploads are decoded incrementally
+        if self.headers.get("Transfer-Encoding", "").lower() != "chunked":
+            yield from self.read_body().splitlines()
+            return
+        pending = b""
+        while True:
+            size_line = self.rfile.readline()
+            try:
+                size = int(size_line.split(b";")[0].strip(), 16)
+            except ValueError:
+                raise MalformedBody("Invalid chunk size %r" % size_line[:32])
+            if size == 0:
+                while self.rfile.readline() not in (b"\r\n", b"\n", b""):     # Trailers
+                    pass
+                break
+            pending += self.rfile.read(size)
+            self.rfile.readline()
+            *lines, pending = pending.split(b"\n")
+            yield from lines
+        if pending:
+            yield pending
+
+    def session_id(self, message: dict = None) -> str:
+        if message is not None and "session" in message:
+            return str(message["session"])
+        return parse_qs(urlparse(self.path).query).get("session", [DEFAULT_SESSION])[0]
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/state":
+            self.send_json(200, {"ok": True, "server": "arm", "sessions": len(self.server.store.sessions)})
+            return
+        session = self.server.store.get(self.session_id())
+        with session.lock:
+            self.send_json(200, {"ok": True, "state": game_state(session.game)})
+
     def do_POST(self):
-        print("ARM: Recieved POST")
-        content_length = int(self.headers['Content-length'])
-        post_data_bytes = self.rfile.read(content_length)
-        print("ARM: %d" % post_data_bytes)
-        post_data = json.loads(post_data_bytes.decode('utf-8'))
-        
-        match post_data["type"]:
-            case "action":
-                self.game.process_turn(post_data["action"], post_data["player"], post_data["amount"])
-            case "setPlayer":
-                self.game.set_player(post_data["player_count"])
-        
-        
+        if urlparse(self.path).path == "/batch":
+            self.post_batch()
+            return
+        try:
+            message = json.loads(self.read_body().decode("utf-8"))
+        except ValueError as e:
+            self.send_json(400, {"ok": False, "error": "Invalid JSON: %s" % e})
+            return
+        if not isinstance(message, dict):
+            self.send_json(400, {"ok": False, "error": "A message must be a JSON object"})
+            return
+
+        session = self.server.store.get(self.session_id(message))
+        with session.lock:
+            try:
+                apply_message(session.game, message)
+            except ValueError as e:
+                self.send_json(400, {"ok": False, "error": str(e), "state": game_state(session.game)})
+                return
+            session.updated = time.time()
+            self.send_json(200, {"ok": True, "state": game_state(session.game)})
+
+    def post_batch(self):
+        chunked = self.headers.get("Transfer-Encoding", "").lower() == "chunked"
+        if chunked:
+            self.connection.settimeout(STREAM_READ_TIMEOUT)     # Bounds how long a stalled upload holds the session lock
+        self.applied = 0
+        try:
+            self.apply_batch(self.read_lines())
+        except TimeoutError:
+            self.close_connection = True        # The rest of the body never came, the stream cannot be reused
+            self.send_json(408, {"ok": False, "error": "Timed out reading the batch", "applied": self.applied})
+        except MalformedBody as e:
+            self.close_connection = True        # Lost track of the chunk boundaries, the stream cannot be reused
+            self.send_json(400, {"ok": False, "error": str(e), "applied": self.applied})
+        finally:
+            if chunked:
+                self.connection.settimeout(self.timeout)
+
+    def apply_batch(self, lines):
+        first = None
+        for line in lines:      # The first message picks the session
+            if line.strip():
+                first = line
+                break
+        if first is None:
+            self.send_json(400, {"ok": False, "error": "Empty batch", "applied": 0})
+            return
+        try:
+            message = json.loads(first)
+        except ValueError as e:
+            self.send_json(400, {"ok": False, "error": "Invalid JSON: %s" % e, "applied": 0})
+            return
+        if isinstance(message, list):       # Whole batch sent as one JSON array
+            messages = iter(message)
+            message = next(messages, None)
+            if message is None:
+                self.send_json(400, {"ok": False, "error": "Empty batch", "applied": 0})
+                return
+            if any(line.strip() for line in lines):
+                self.send_json(400, {"ok": False, "error": "Nothing may follow a JSON array batch", "applied": 0})
+                return
+        else:
+            messages = (json.loads(line) for line in lines if line.strip())
+        if not isinstance(message, dict):
+            for _ in lines:
+                pass
+            self.send_json(400, {"ok": False, "error": "A message must be a JSON object", "applied": 0})
+            return
+
+        session = self.server.store.get(self.session_id(message))
+        with session.lock:
+            try:
+                while True:
+                    apply_message(session.game, message)
+                    self.applied += 1
+                    message = next(messages, END)
+                    if message is END:
+                        break
+            except ValueError as e:
+                for _ in lines:     # Drain the rest of the body so the connection can be reused
+                    pass
+                session.updated = time.time()
+                self.send_json(400, {"ok": False, "error": str(e), "applied": self.applied, "state": game_state(session.game)})
+                return
+            session.updated = time.time()
+            self.send_json(200, {"ok": True, "applied": self.applied, "state": game_state(session.game)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class GameServer(ThreadingHTTPServer):       # Keeps the sessions alive across requests and connections
+    daemon_threads = True
+
+    def __init__(self, address, verbose: bool = False) -> None:
+        super().__init__(address, ArmServer)
+        self.store = SessionStore()
+        self.verbose = verbose
+
+
 if __name__ == "__main__":
-    webServer = HTTPServer((hostName, serverPort), ArmServer)
+    webServer = GameServer((hostName, serverPort))
     print("Server started %s "% AI_SERVER_URL)
 
-    try: 
+    try:
         webServer.serve_forever()
     except KeyboardInterrupt:
         pass
 
     webServer.server_close()
     print("Server stopped.")
-        
\ No newline at end of file
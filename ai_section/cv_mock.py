@@ -2,14 +2,17 @@ import requests
 # Change server to ip of poker ai server
 SERVER = "http://0.0.0.0:666/"
 
+# One session for the whole run so every move reuses the same pooled connection
+session = requests.Session()
+
 while True:
     print("What move has been conducted?")
     move = input("").lower()
     match move:
         case "fold": 
-            requests.post(SERVER, json={"move":"fold"})
+            session.post(SERVER, json={"move":"fold"})
         case "check":
-            requests.post(SERVER, json={"move":"check"})
+            session.post(SERVER, json={"move":"check"})
         case "raise":
             amount = input("What is the stake?")
-            requests.post(SERVER, json={"move":"raise", "amount":amount})
\ No newline at end of file
+            session.post(SERVER, json={"move":"raise", "amount":amount})
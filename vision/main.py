@@ -1,6 +1,7 @@
+import argparse
+import multiprocessing
 import threading
 import time
-import queue
 import cv2
 import json
 from dotenv import load_dotenv
@@ -8,54 +9,160 @@ from dotenv import load_dotenv
 # Load the environment variables
 load_dotenv()
 
-shared_frame = {"birds_eye": None}
-birds_eye_lock = threading.Lock()
-event_queue = queue.Queue()
+from src.utils.frame_ring import FrameRing
+from src.utils.event_queue import EventQueue
+from src.utils.shared_frame_ring import SharedFrameRing
+
+frame_ring = FrameRing()
+event_queue = EventQueue()
 stop_event = threading.Event()
 chip_detection_event = threading.Event()
 
 from src.threads.birds_eye_camera import birds_eye_camera_thread
-from src.threads.chip_detection import chip_detection_thread
+from src.threads.card_recognition import card_recognition_thread
+from src.models.card_recognizer import DEFAULT_TEMPLATE_DIR, missing_templates
+from src.threads.chip_detection import chip_detection_thread, chip_detection_stage
 from src.threads.event_aggregator import event_aggregator_thread
 from src.threads.fold_detection import fold_detection_thread
 from src.threads.hand_tracking import hand_tracking_thread
 from src.threads.key_listener import key_listener_thread
+from src.utils.event_dispatcher import EventDispatcher, STOP, log_event
+from src.utils.ai_client import AIServerClient, forward_events
+from src.utils.debug_stream import start_debug_stream
+from src.utils.frame_source import open_capture, capture_time
+from src.utils.metrics import metrics, start_metrics_server, metrics_logger_thread
+from src.utils.process_stages import StageProcesses, event_relay_thread
 
-def main():
+def main(headless=False, debug_stream_port=None, replay_dir=None, record_dir=None, realtime=True,
+         metrics_port=None, metrics_interval=None, hand_backend="roboflow", hand_model=None, processes=False,
+         bind="127.0.0.1"):
+    # headless: no windows, annotations or virtual camera, every stage reads the birds-eye frames from frame_ring
+    # replay_dir/record_dir: play the cameras back from, or record them to, birds_eye.frames and chip.frames
+    # processes: chip, fold, hand and card detection run in worker processes reading frames from shared memory
+    # bind: address the debug stream and metrics servers listen on
     threads = []
+    birds_eye_cap = open_capture("birds_eye", 0, replay_dir, record_dir, realtime)
+
+    ring, stop, chip_event, stages = frame_ring, stop_event, chip_detection_event, None
+    if processes:
+        context = multiprocessing.get_context("spawn")
+        stop, chip_event = context.Event(), context.Event()
+        # The shared block cannot grow later, so it is sized from a frame the camera actually delivered
+        ret, first = birds_eye_cap.read()
+        if not ret:
+            print("Unable to read a first frame from the birds-eye camera to size the shared frame ring.")
+            birds_eye_cap.release()
+            return
+        ring = SharedFrameRing(first.shape, context=context)
+        ring.write(first, capture_time(birds_eye_cap))
+        stages = StageProcesses(context)
+
+    dispatcher = EventDispatcher()
+    dispatcher.subscribe("log", log_event, events=["error", "info"])
+    ai_client = AIServerClient()
+    dispatcher.subscribe("ai_server", forward_events(ai_client), sources=["fold_detection", "card_recognition"])
+
+    metrics.gauge("event_queue.depth", event_queue.qsize)
+    metrics.gauge("event_queue", event_queue.stats)
+    metrics.gauge("frame_ring.seq", lambda: ring.seq)
+    metrics.gauge("subscribers", dispatcher.stats)
+    metrics.gauge("ai_client.pending", ai_client.pending.qsize)
+    if metrics_interval is not None:
+        threads.append(threading.Thread(target=metrics_logger_thread, args=(stop, metrics_interval), name="MetricsLogger", daemon=True))
 
-    birds_eye_thread = threading.Thread(target=birds_eye_camera_thread, args=(shared_frame, birds_eye_lock, event_queue, stop_event), name="BirdsEyeCamera", daemon=True)
+    # Card recognition only starts once every rank and suit template has been captured
+    read_cards = not missing_templates()
+    if not read_cards:
+        print(f"Community card recognition is off: capture the card templates into {DEFAULT_TEMPLATE_DIR} with setup_areas.py first.")
+
+    birds_eye_thread = threading.Thread(target=birds_eye_camera_thread, args=(ring, event_queue, stop, headless, birds_eye_cap), name="BirdsEyeCamera", daemon=True)
     threads.append(birds_eye_thread)
 
-    chip_thread = threading.Thread(target=chip_detection_thread, args=(event_queue, stop_event, chip_detection_event), name="ChipDetection", daemon=True)
-    threads.append(chip_thread)
+    if stages is not None:
+        stages.add("ChipDetection", chip_detection_stage, stop_event=stop, chip_detection_event=chip_event,
+                   replay_dir=replay_dir, record_dir=record_dir, realtime=realtime)
+        stages.add("FoldDetection", fold_detection_thread, frame_ring=ring, stop_event=stop, headless=headless)
+        stages.add("HandTracking", hand_tracking_thread, stop_event=stop, frame_ring=ring, headless=headless,
+                   backend=hand_backend, model_path=hand_model)
+        if read_cards:
+            stages.add("CardRecognition", card_recognition_thread, frame_ring=ring, stop_event=stop)
+        metrics.gauge("stages.alive", stages.alive)
+        metrics.gauge("stages", lambda: stages.stage_metrics)
+    else:
+        chip_cap = open_capture("chip", 1, replay_dir, record_dir, realtime)
+        chip_thread = threading.Thread(target=chip_detection_thread, args=(event_queue, stop, chip_event, chip_cap), name="ChipDetection", daemon=True)
+        threads.append(chip_thread)
+
+        fold_thread = threading.Thread(target=fold_detection_thread, args=(ring, event_queue, stop, headless), name="FoldDetection", daemon=True)
+        threads.append(fold_thread)
 
-    fold_thread = threading.Thread(target=fold_detection_thread, args=(shared_frame, birds_eye_lock, event_queue, stop_event), name="FoldDetection", daemon=True)
-    threads.append(fold_thread)
+        hand_thread = threading.Thread(target=hand_tracking_thread, args=(event_queue, stop, ring, headless, hand_backend, hand_model), name="HandTracking", daemon=True)
+        threads.append(hand_thread)
 
-    hand_thread = threading.Thread(target=hand_tracking_thread, args=(event_queue, stop_event), name="HandTracking", daemon=True)
-    threads.append(hand_thread)
+        if read_cards:
+            card_thread = threading.Thread(target=card_recognition_thread, args=(ring, event_queue, stop), name="CardRecognition", daemon=True)
+            threads.append(card_thread)
 
-    aggregator_thread = threading.Thread(target=event_aggregator_thread, args=(event_queue, stop_event), name="Aggregator", daemon=True)
+    aggregator_thread = threading.Thread(target=event_aggregator_thread, args=(event_queue, stop, dispatcher), name="Aggregator", daemon=True)
     threads.append(aggregator_thread)
 
-    key_thread = threading.Thread(target=key_listener_thread, args=(stop_event, chip_detection_event), name="KeyListener", daemon=True)
+    key_thread = threading.Thread(target=key_listener_thread, args=(stop, chip_event), name="KeyListener", daemon=True)
     threads.append(key_thread)
 
+    if stages is not None:
+        stages.start()
+        relay_thread = threading.Thread(target=event_relay_thread, args=(stages, event_queue, stop), name="EventRelay", daemon=True)
+        relay_thread.start()
     for t in threads:
         t.start()
+
+    metrics_server = start_metrics_server(metrics_port, host=bind) if metrics_port is not None else None
+    debug_server = None
+    if debug_stream_port is not None:
+        with open("vision/config.json", "r") as f:
+            config = json.load(f)
+        regions = {name: area for name, area in config.items() if isinstance(area, list) and len(area) == 4}
+        debug_server = start_debug_stream(ring, stop, debug_stream_port, regions, host=bind)
     print("All threads started. Press Ctrl+C or 'q' in the console to exit.")
 
     try:
-        while not stop_event.is_set():
+        while not stop.is_set():
             time.sleep(0.01)
     except KeyboardInterrupt:
-        stop_event.set()
+        stop.set()
         print("KeyboardInterrupt detected, exiting.")
 
+    if stages is not None:
+        # Workers first, so their last events are relayed before the aggregator is stopped
+        stages.join()
+        relay_thread.join(timeout=1.0)
+    event_queue.put(STOP)
+
     for t in threads:
         t.join()
-    cv2.destroyAllWindows()
+    ai_client.close()
+    if debug_server is not None:
+        debug_server.shutdown()
+    if metrics_server is not None:
+        metrics_server.shutdown()
+    if stages is not None:
+        ring.close()
+    if not headless:
+        cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Poker vision pipeline")
+    parser.add_argument("--headless", action="store_true", help="No GUI windows, annotations or virtual camera")
+    parser.add_argument("--debug-stream", type=int, default=None, metavar="PORT", help="Serve an MJPEG view of the birds-eye frames on PORT")
+    parser.add_argument("--record", default=None, metavar="DIR", help="Record both cameras to DIR")
+    parser.add_argument("--replay", default=None, metavar="DIR", help="Play recorded cameras back from DIR instead of the hardware")
+    parser.add_argument("--max-speed", action="store_true", help="Replay as fast as possible instead of in real time")
+    parser.add_argument("--metrics-port", type=int, default=None, metavar="PORT", help="Serve JSON pipeline metrics on PORT")
+    parser.add_argument("--metrics-interval", type=float, default=None, metavar="SECONDS", help="Print a metrics snapshot every SECONDS")
+    parser.add_argument("--hand-backend", choices=["roboflow", "onnx"], default="roboflow", help="onnx runs a local model offline on the CPU")
+    parser.add_argument("--hand-model", default=None, metavar="PATH", help="ONNX hand model for --hand-backend onnx")
+    parser.add_argument("--bind", default="127.0.0.1", metavar="ADDRESS", help="Address for --debug-stream and --metrics-port, 0.0.0.0 for every interface")
+    parser.add_argument("--processes", action="store_true", help="Run chip, fold, hand and card detection in worker processes")
+    args = parser.parse_args()
+    main(args.headless, args.debug_stream, args.replay, args.record, not args.max_speed,
+         args.metrics_port, args.metrics_interval, args.hand_backend, args.hand_model, args.processes, args.bind)
@@ -2,8 +2,12 @@ import cv2
 import json
 import os
 
+from src.models.card_recognizer import RANKS, SUITS, missing_templates, save_templates, slot_views
+
 # File to store the configuration
 CONFIG_FILE = "config.json"
+# Rank and suit images the community card recognition matches against
+TEMPLATE_DIR = "card_templates"
 
 # Default regions if no config file exists
 default_regions = {
@@ -95,6 +99,23 @@ def save_and_exit():
     cv2.destroyAllWindows()
     exit()
 
+# Save the rank and suit of the cards laid out in community_cards as card templates
+def capture_templates(frame):
+    print("Cards in the community_cards slots, left to right, '-' for an empty slot (e.g. Ah Ts - 7d):")
+    cards = []
+    for label in input("> ").split():
+        if label == "-":
+            cards.append(None)
+        elif len(label) == 2 and label[0].upper() in RANKS and label[1].lower() in SUITS:
+            cards.append(label[0].upper() + label[1].lower())
+        else:
+            print(f"Not a card: {label}")
+            return
+    saved = save_templates(slot_views(frame, regions["community_cards"]), cards, TEMPLATE_DIR)
+    print("Saved templates:", " ".join(saved) if saved else "none, no card was found in those slots")
+    missing = missing_templates(TEMPLATE_DIR)
+    print("Still missing:", " ".join(missing) if missing else "nothing, card recognition is ready")
+
 # Set up OpenCV window
 cv2.namedWindow("Setup Regions")
 cv2.setMouseCallback("Setup Regions", mouse_callback)
@@ -102,12 +123,14 @@ cv2.setMouseCallback("Setup Regions", mouse_callback)
 print("Instructions:")
 print("- Left-click **inside a region** to move it")
 print("- Left-click **on a corner** to resize")
+print("- Press **t** to capture card templates from the cards in community_cards")
 print("- Press **Enter** to save changes and exit")
 
 while True:
     ret, frame = cap.read()
     if not ret:
         break
+    clean = frame.copy()    # Templates are captured without the region overlays
 
     # Draw all regions
     for key, (x, y, w, h) in regions.items():
@@ -124,6 +147,8 @@ while True:
     key = cv2.waitKey(1) & 0xFF
     if key == 13:  # Enter key
         save_and_exit()
+    elif key == ord("t"):  # Capture card templates
+        capture_templates(clean)
     elif key == ord("q"):  # Quit without saving
         cap.release()
         cv2.destroyAllWindows()
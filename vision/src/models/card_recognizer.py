@@ -0,0 +1,195 @@
+import os
+
+import cv2
+import numpy as np
+
+DEFAULT_TEMPLATE_DIR = "vision/card_templates"
+RANKS = "23456789TJQKA"         # Same rank and suit characters as the AI side's evaluator, so "Ah", "Td", ...
+SUITS = "shdc"
+SLOTS = 5                       # Flop, turn and river, laid out left to right across community_cards
+CARD_SIZE = (200, 300)          # Width, height every card quad is warped to
+CORNER = (slice(4, 88), slice(4, 36))       # Rank and suit index in the top-left corner of a warped card
+SYMBOL_SIZE = (32, 48)          # Width, height of a rank or suit descriptor
+MIN_CARD_FRACTION = 0.2         # A card covers at least this much of its slot
+MIN_SCORE = 0.6                 # Correlation below which a symbol is reported as unknown
+CHANGE_THRESHOLD = 4.0          # Mean grey-level difference of a slot's thumbnail that counts as a change
+
+
+def descriptor(symbol):
+    # Binarised, resized and normalised symbol image as one vector, so matching is a dot product
+    if symbol.ndim == 3:
+        symbol = cv2.cvtColor(symbol, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(symbol, 0, 1, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    vector = cv2.resize(binary.astype(np.float32), SYMBOL_SIZE, interpolation=cv2.INTER_AREA).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class TemplateIndex:
+    """
+    In-memory index of template descriptors. Every template is turned into
+    a normalised vector once, at load time, and the vectors are stacked into
+    one matrix, so matching a symbol is a single matrix-vector product and
+    an argmax instead of a cv2.matchTemplate call per template.
+    """
+
+    def __init__(self, templates):
+        # templates: {label: grey or BGR image of the symbol}
+        self.labels = list(templates)
+        self.matrix = np.stack([descriptor(image) for image in templates.values()]) if templates else np.zeros((0, SYMBOL_SIZE[0] * SYMBOL_SIZE[1]), np.float32)
+
+    @classmethod
+    def from_directory(cls, path, labels):
+        # <path>/<label>.png for every label that has a file
+        templates = {}
+        for label in labels:
+            file = os.path.join(path, f"{label}.png")
+            if os.path.exists(file):
+                templates[label] = cv2.imread(file, cv2.IMREAD_GRAYSCALE)
+        return cls(templates)
+
+    def match(self, symbol, min_score=MIN_SCORE):
+        # (label, score) of the best template, label None if nothing scores min_score
+        if not self.labels:
+            return None, 0.0
+        scores = self.matrix @ descriptor(symbol)
+        best = int(scores.argmax())
+        return (self.labels[best] if scores[best] >= min_score else None), float(scores[best])
+
+
+def order_corners(quad):
+    # Top-left, top-right, bottom-right, bottom-left
+    points = quad.reshape(4, 2).astype(np.float32)
+    sums, diffs = points.sum(axis=1), np.diff(points, axis=1).ravel()
+    return np.array([points[sums.argmin()], points[diffs.argmin()], points[sums.argmax()], points[diffs.argmax()]])
+
+
+def find_card(grey):
+    # Corners of the largest bright quad in a slot, None if the slot holds no card
+    _, binary = cv2.threshold(cv2.GaussianBlur(grey, (5, 5), 0), 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    contour = max(contours, key=cv2.contourArea)
+    if cv2.contourArea(contour) < MIN_CARD_FRACTION * grey.shape[0] * grey.shape[1]:
+        return None
+    hull = cv2.convexHull(contour)
+    quad = cv2.approxPolyDP(hull, 0.04 * cv2.arcLength(hull, True), True)
+    if len(quad) != 4:
+        quad = cv2.boxPoints(cv2.minAreaRect(hull))      # Rounded or clipped corners, take the enclosing rectangle
+    return order_corners(quad)
+
+
+def warp_card(grey, corners):
+    # Card straightened to CARD_SIZE, portrait even if it lies sideways
+    tl, tr, br, bl = corners
+    if np.linalg.norm(tr - tl) > np.linalg.norm(bl - tl):
+        corners = np.array([tr, br, bl, tl])
+    width, height = CARD_SIZE
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    return cv2.warpPerspective(grey, cv2.getPerspectiveTransform(corners, target), CARD_SIZE)
+
+
+def corner_symbols(card):
+    # Rank and suit images from the corner index, rank above suit, None if either is missing
+    corner = card[CORNER]
+    _, binary = cv2.threshold(corner, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = [cv2.boundingRect(contour) for contour in contours if cv2.contourArea(contour) >= 8]
+    middle = corner.shape[0] / 2
+    parts = []
+    for upper in (True, False):
+        # A "10" is two blobs, so each half is the union of the boxes centred in it
+        half = [(x, y, w, h) for x, y, w, h in boxes if (y + h / 2 < middle) == upper]
+        if not half:
+            return None
+        x0, y0 = min(x for x, y, w, h in half), min(y for x, y, w, h in half)
+        x1, y1 = max(x + w for x, y, w, h in half), max(y + h for x, y, w, h in half)
+        parts.append(corner[y0:y1, x0:x1])
+    return parts
+
+
+def slot_views(frame, region, slots=SLOTS):
+    # Grey slots of the region; the grey conversion copies, so they stay intact once the frame is reused
+    x, y, w, h = (int(v) for v in region)
+    grey = cv2.cvtColor(frame[y:y + h, x:x + w], cv2.COLOR_BGR2GRAY)
+    width = grey.shape[1] // slots
+    return [grey[:, i * width:(i + 1) * width] for i in range(slots)]
+
+
+def missing_templates(path=DEFAULT_TEMPLATE_DIR):
+    # Rank and suit labels that have no <label>.png in path yet
+    return [label for label in RANKS + SUITS if not os.path.exists(os.path.join(path, f"{label}.png"))]
+
+
+def save_templates(views, cards, path=DEFAULT_TEMPLATE_DIR):
+    # Writes the corner rank and suit of each known card ("Ah", or None to skip a slot) as templates, returns the labels saved
+    os.makedirs(path, exist_ok=True)
+    saved = []
+    for grey, card in zip(views, cards):
+        corners = find_card(grey) if card else None
+        symbols = corner_symbols(warp_card(grey, corners)) if corners is not None else None
+        if symbols is None:
+            continue
+        for label, symbol in zip(card, symbols):
+            cv2.imwrite(os.path.join(path, f"{label}.png"), symbol)
+            saved.append(label)
+    return saved
+
+
+class CommunityCardRecognizer:
+    """
+    Reads the community cards from the `community_cards` region.
+
+    The region is cropped and converted to grey once per frame and split into
+    SLOTS equal columns. Each slot keeps a small thumbnail of the pixels its
+    last result was computed from; while a new frame's thumbnail stays within
+    CHANGE_THRESHOLD of it the cached card is reused, so a static board costs
+    one resize per slot. Only a changed slot is searched for a card quad,
+    warped, and its rank and suit matched against the template indexes.
+    """
+
+    def __init__(self, region, ranks, suits, slots=SLOTS):
+        self.region = tuple(int(v) for v in region)
+        self.ranks = ranks
+        self.suits = suits
+        self.slots = slots
+        self.thumbnails = [None] * slots
+        self.cards = [None] * slots
+        self.recomputed = 0
+
+    @classmethod
+    def from_templates(cls, region, template_dir=DEFAULT_TEMPLATE_DIR, slots=SLOTS):
+        return cls(region, TemplateIndex.from_directory(template_dir, RANKS), TemplateIndex.from_directory(template_dir, SUITS), slots)
+
+    def slot_views(self, frame):
+        return slot_views(frame, self.region, self.slots)
+
+    def recognize(self, grey):
+        # "Ah"-style card in one slot, None if there is no card or it cannot be read
+        corners = find_card(grey)
+        if corners is None:
+            return None
+        symbols = corner_symbols(warp_card(grey, corners))
+        if symbols is None:
+            return None
+        rank, _ = self.ranks.match(symbols[0])
+        suit, _ = self.suits.match(symbols[1])
+        return rank + suit if rank and suit else None
+
+    def update(self, frame):
+        # Cards per slot for a new frame, left to right
+        return self.update_slots(self.slot_views(frame))
+
+    def update_slots(self, views):
+        # Same, for slots already taken from a frame with slot_views
+        for i, grey in enumerate(views):
+            thumbnail = cv2.resize(grey, (16, 16), interpolation=cv2.INTER_AREA).astype(np.int16)
+            previous = self.thumbnails[i]
+            if previous is not None and np.abs(thumbnail - previous).mean() < CHANGE_THRESHOLD:
+                continue
+            self.thumbnails[i] = thumbnail
+            self.cards[i] = self.recognize(grey)
+            self.recomputed += 1
+        return list(self.cards)
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+DEFAULT_MODEL_PATH = "vision/models/hand_detector.onnx"
+
+
+class OnnxHandDetector:
+    """
+    Local CPU hand detector for a YOLO-style ONNX export (output shaped
+    (batch, 4 + classes, anchors) with centre x/y, width, height and class
+    scores in input pixels), e.g. `yolo export format=onnx dynamic=True`.
+
+    Only the given regions are looked at: each region is cropped, letterboxed
+    to the model's input size and the crops go through the session as one
+    batch (or one at a time if the export has a fixed batch of 1). Detections
+    are mapped back to full-frame pixel coordinates.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, confidence=0.4, iou=0.5, threads=2):
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.size = model_input.shape[2] if isinstance(model_input.shape[2], int) else 320
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.confidence = confidence
+        self.iou = iou
+
+    def letterbox(self, crop):
+        # Resize keeping aspect ratio and pad to size x size, returns the CHW float tensor, scale and padding
+        h, w = crop.shape[:2]
+        scale = self.size / max(h, w)
+        resized = cv2.resize(crop, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_LINEAR)
+        canvas = np.full((self.size, self.size, 3), 114, dtype=np.uint8)
+        pad_y, pad_x = (self.size - resized.shape[0]) // 2, (self.size - resized.shape[1]) // 2
+        canvas[pad_y:pad_y + resized.shape[0], pad_x:pad_x + resized.shape[1]] = resized
+        tensor = cv2.cvtColor(canvas, cv2.COLOR_BGR2RGB).transpose(2, 0, 1).astype(np.float32) / 255.0
+        return tensor, scale, pad_x, pad_y
+
+    def run(self, batch):
+        if self.dynamic_batch or len(batch) == 1:
+            return self.session.run(None, {self.input_name: batch})[0]
+        return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(batch))])
+
+    def detect(self, frame, regions):
+        # [(x, y, confidence, region name)] for hands found inside `regions` ({name: (x, y, w, h)})
+        crops = []
+        for name, (x, y, w, h) in regions.items():
+            crop = frame[y:y + h, x:x + w]
+            if crop.size:
+                crops.append((name, x, y) + self.letterbox(crop))
+        if not crops:
+            return []
+
+        outputs = self.run(np.stack([crop[3] for crop in crops]))
+        hands = []
+        for (name, x0, y0, _, scale, pad_x, pad_y), output in zip(crops, outputs):
+            predictions = output.T                      # (anchors, 4 + classes)
+            scores = predictions[:, 4:].max(axis=1)
+            keep = scores >= self.confidence
+            if not keep.any():
+                continue
+            boxes, scores = predictions[keep, :4], scores[keep]
+            xywh = np.column_stack([boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2], boxes[:, 3]])
+            for i in np.array(cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.confidence, self.iou)).flatten():
+                cx, cy = boxes[i, 0], boxes[i, 1]
+                hands.append((float(x0 + (cx - pad_x) / scale), float(y0 + (cy - pad_y) / scale), float(scores[i]), name))
+        return hands
+
+
+class AdaptiveSkipper:
+    """
+    Decides which frames to run hand detection on. While a hand has been
+    seen within the last `active_seconds` every frame is processed; once the
+    table has been quiet for longer, only one frame per `idle_interval`
+    seconds is, so an idle table costs a fraction of the inference.
+    """
+
+    def __init__(self, active_seconds=1.0, idle_interval=0.25):
+        self.active_seconds = active_seconds
+        self.idle_interval = idle_interval
+        self.last_hand = None
+        self.last_run = None
+
+    def should_run(self, timestamp):
+        if self.last_run is None or (self.last_hand is not None and timestamp - self.last_hand < self.active_seconds):
+            return True
+        return timestamp - self.last_run >= self.idle_interval
+
+    def update(self, timestamp, found):
+        self.last_run = timestamp
+        if found:
+            self.last_hand = timestamp
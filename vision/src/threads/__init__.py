@@ -1,15 +1,18 @@
 from .birds_eye_camera import birds_eye_camera_thread
-from .chip_detection import chip_detection_thread
+from .chip_detection import chip_detection_thread, chip_detection_stage
 from .fold_detection import fold_detection_thread
 from .hand_tracking import hand_tracking_thread
+from .card_recognition import card_recognition_thread
 from .key_listener import key_listener_thread
 from .event_aggregator import event_aggregator_thread
 
 __all__ = [
     'birds_eye_camera_thread',
     'chip_detection_thread',
+    'chip_detection_stage',
     'fold_detection_thread',
     'hand_tracking_thread',
+    'card_recognition_thread',
     'key_listener_thread',
     'event_aggregator_thread'
 ]
\ No newline at end of file
@@ -1,11 +1,16 @@
+import contextlib
+import time
 import cv2
-import pyvirtualcam
-import threading
-import queue
 
-def birds_eye_camera_thread(shared_frame, birds_eye_lock, event_queue, stop_event):
+from src.utils.frame_source import capture_time
+from src.utils.metrics import metrics
+
+def birds_eye_camera_thread(frame_ring, event_queue, stop_event, headless=False, cap=None):
+    # headless: no virtual camera and no window, frames only go to frame_ring for in-process consumers
+    # cap: any cv2.VideoCapture-like source (replay, recording), the physical camera if None
     physical_cam_index = 0
-    cap = cv2.VideoCapture(physical_cam_index)
+    if cap is None:
+        cap = cv2.VideoCapture(physical_cam_index)
     if not cap.isOpened():
         event_queue.put({
             "source": "birds_eye_camera",
@@ -16,15 +21,31 @@ def birds_eye_camera_thread(shared_frame, birds_eye_lock, event_queue, stop_even
 
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) or 640
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) or 480
+    shape = getattr(frame_ring, "shape", None) or (height, width, 3)     # A SharedFrameRing is sized from a real frame already
+    height, width = shape[:2]
     fps = cap.get(cv2.CAP_PROP_FPS) or 20
 
     print(f"Camera properties - Width: {width}, Height: {height}, FPS: {fps}")
 
     try:
-        with pyvirtualcam.Camera(width=width, height=height, fps=fps) as virtual_cam:
-            print(f"Virtual camera created: {virtual_cam.device}")
+        if headless:
+            camera = contextlib.nullcontext()
+        else:
+            import pyvirtualcam
+            camera = pyvirtualcam.Camera(width=width, height=height, fps=fps)
+        with camera as virtual_cam:
+            if virtual_cam is not None:
+                print(f"Virtual camera created: {virtual_cam.device}")
+            frames = metrics.counter("birds_eye.frames")
+            capture_latency = metrics.histogram("birds_eye.capture")
+            render_latency = metrics.histogram("birds_eye.render")
             while not stop_event.is_set():
-                ret, frame = cap.read()
+                # Decode straight into the next ring slot, consumers borrow it from there without copying
+                slot = frame_ring.reserve(shape)
+                start = time.perf_counter()
+                ret, frame = cap.read(slot)
+                capture_latency.observe((time.perf_counter() - start) * 1000)
+                timestamp = capture_time(cap)
                 if not ret:
                     event_queue.put({
                         "source": "birds_eye_camera",
@@ -33,14 +54,23 @@ def birds_eye_camera_thread(shared_frame, birds_eye_lock, event_queue, stop_even
                     })
                     break
 
+                if frame is not slot:
+                    shape = frame.shape     # The camera ignored the size it reported, read into that size from now on
+                    frame_ring.write(frame, timestamp)
+                else:
+                    frame_ring.commit(timestamp)
+                frames.inc()
+
+                if headless:
+                    continue
+
+                start = time.perf_counter()
                 rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
                 virtual_cam.send(rgb_frame)
                 virtual_cam.sleep_until_next_frame()
 
-                with birds_eye_lock:
-                    shared_frame["birds_eye"] = frame.copy()
-
                 cv2.imshow("Physical Camera Feed", frame)
+                render_latency.observe((time.perf_counter() - start) * 1000)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     stop_event.set()
                     break
@@ -49,8 +79,9 @@ def birds_eye_camera_thread(shared_frame, birds_eye_lock, event_queue, stop_even
         event_queue.put({
             "source": "birds_eye_camera",
             "event": "error",
-            "message": f"Virtual camera error: {e}"
+            "message": f"Birds-eye camera stopped: {e}"
         })
     finally:
         cap.release()
-        cv2.destroyWindow("Physical Camera Feed")
\ No newline at end of file
+        if not headless:
+            cv2.destroyWindow("Physical Camera Feed")
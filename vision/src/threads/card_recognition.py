@@ -0,0 +1,60 @@
+import json
+import time
+
+from src.models.card_recognizer import CommunityCardRecognizer, DEFAULT_TEMPLATE_DIR, missing_templates
+from src.utils.metrics import metrics
+
+def card_recognition_thread(frame_ring, event_queue, stop_event, template_dir=DEFAULT_TEMPLATE_DIR):
+    # Reads the community cards from each new birds-eye frame and reports the board whenever it changes
+    try:
+        with open("vision/config.json", "r") as f:
+            region = json.load(f)["community_cards"]
+    except Exception as e:
+        event_queue.put({
+            "source": "card_recognition",
+            "event": "error",
+            "message": f"Failed to load community_cards region: {e}"
+        })
+        return
+    missing = missing_templates(template_dir)
+    if missing:
+        event_queue.put({
+            "source": "card_recognition",
+            "event": "error",
+            "message": f"No card templates for {' '.join(missing)} in {template_dir}, capture them with setup_areas.py"
+        })
+        return
+
+    recognizer = CommunityCardRecognizer.from_templates(region, template_dir)
+    frames = metrics.counter("cards.frames")
+    recomputed = metrics.counter("cards.recomputed_slots")
+    latency = metrics.histogram("cards.recognize")
+    torn = metrics.counter("cards.torn_frames")
+
+    cards = [None] * recognizer.slots
+    last_seq = 0
+    while not stop_event.is_set():
+        borrowed = frame_ring.wait(after=last_seq, timeout=0.1)
+        if borrowed is None:
+            continue
+        last_seq = borrowed.seq
+        before = recognizer.recomputed
+        start = time.perf_counter()
+        views = recognizer.slot_views(borrowed.image)
+        if not borrowed.valid():
+            # The camera lapped the ring while the slots were copied, nothing from this frame is cached or reported
+            torn.inc()
+            continue
+        current = recognizer.update_slots(views)
+        latency.observe((time.perf_counter() - start) * 1000)
+        frames.inc()
+        recomputed.inc(recognizer.recomputed - before)
+        if current != cards:
+            cards = current
+            event_queue.put({
+                "source": "card_recognition",
+                "event": "community_cards",
+                "slots": cards,
+                "cards": [card for card in cards if card is not None],
+                "timestamp": borrowed.timestamp
+            })
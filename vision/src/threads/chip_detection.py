@@ -1,11 +1,84 @@
 import os
 import cv2
 import json
+import time
+import numpy as np
 from ultralytics import YOLO
 import threading
 import queue
 
-def chip_detection_thread(event_queue, stop_event, chip_detection_event):
+from src.utils.frame_ring import FrameRing
+from src.utils.frame_source import capture_time, open_capture
+from src.utils.metrics import metrics
+
+CHIP_CAMERA_INDEX = 1
+WARMUP_SIZE = (640, 640, 3)
+READ_RETRY_MAX = 2.0      # Longest wait between reads of a failing chip camera
+
+
+def chip_camera_reader(cap, frame_ring, event_queue, stop_event):
+    # Keeps draining the chip camera so the driver buffer never holds stale frames and a count can use the newest one.
+    # A failing camera (unplugged, or the end of a replay) is reported once and retried with backoff until it recovers.
+    backoff = 0
+    while not stop_event.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            if backoff == 0:
+                event_queue.put({
+                    "source": "chip_detection",
+                    "event": "error",
+                    "message": f"Lost chip camera (index {CHIP_CAMERA_INDEX}), retrying quietly."
+                })
+            backoff = min(max(backoff * 2, 0.1), READ_RETRY_MAX)
+            stop_event.wait(backoff)
+            continue
+        if backoff:
+            backoff = 0
+            event_queue.put({
+                "source": "chip_detection",
+                "event": "info",
+                "message": f"Chip camera (index {CHIP_CAMERA_INDEX}) is delivering frames again."
+            })
+        frame_ring.write(frame, capture_time(cap))
+
+
+def warm_up(model):
+    # First inference builds the model graph and allocates buffers, pay for it at startup instead of on the first count
+    model(np.zeros(WARMUP_SIZE, dtype=np.uint8), verbose=False)
+
+
+def chip_regions(config):
+    # pot_area and every player_N rectangle from the config layout
+    return {name: [int(v) for v in area] for name, area in config.items()
+            if (name == "pot_area" or name.startswith("player_")) and isinstance(area, list) and len(area) == 4}
+
+
+def crop_regions(frame, regions):
+    # Views (no copies) of each region in one frame, clamped to the frame and skipping empty ones
+    frame_height, frame_width = frame.shape[:2]
+    crops = {}
+    for name, (x, y, w, h) in regions.items():
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame_width, x + w), min(frame_height, y + h)
+        if x1 > x0 and y1 > y0:
+            crops[name] = frame[y0:y1, x0:x1]
+    return crops
+
+
+def region_values(results, names, class_to_color, chip_values):
+    # Chip value per region from one batched result list, in the order the crops were passed
+    values = {}
+    for name, result in zip(names, results):
+        value = 0
+        for chip_class in result.boxes.cls.tolist():
+            chip_color = class_to_color.get(int(chip_class))
+            if chip_color in chip_values:
+                value += chip_values[chip_color]
+        values[name] = value
+    return values
+
+
+def chip_detection_thread(event_queue, stop_event, chip_detection_event, cap=None):
     model_path = "vision/chips_train/train/weights/best.pt"
     if not os.path.exists(model_path):
         event_queue.put({
@@ -16,60 +89,90 @@ def chip_detection_thread(event_queue, stop_event, chip_detection_event):
         return
 
     model = YOLO(model_path)
-    
+    warm_up(model)
+
     with open("vision/config.json", "r") as f:
         config = json.load(f)
-    
-    chip_values = config["chip_values"] 
+
+    chip_values = config["chip_values"]
+    regions = chip_regions(config)
 
     class_to_color = {2: 'red', 3: 'white', 1: 'blue', 0: 'black'}
 
-    while not stop_event.is_set():
-        if not chip_detection_event.wait(0.1):
-            continue
+    if cap is None:
+        cap = cv2.VideoCapture(CHIP_CAMERA_INDEX)
+    if not cap.isOpened():
+        event_queue.put({
+            "source": "chip_detection",
+            "event": "error",
+            "message": f"Unable to open chip camera (index {CHIP_CAMERA_INDEX})."
+        })
+        return
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
 
-        cap = cv2.VideoCapture(1)
-        if not cap.isOpened():
-            event_queue.put({
-                "source": "chip_detection",
-                "event": "error",
-                "message": "Unable to open chip camera (index 1)."
-            })
-            chip_detection_event.clear()
-            continue
+    chip_ring = FrameRing(slots=3)
+    reader = threading.Thread(target=chip_camera_reader, args=(cap, chip_ring, event_queue, stop_event), name="ChipCamera", daemon=True)
+    reader.start()
+
+    try:
+        while not stop_event.is_set():
+            if not chip_detection_event.wait(0.1):
+                continue
+            requested = time.perf_counter()
+
+            # The reader keeps overwriting the ring, so the crops are copied and used only if the
+            # slot was not reused while copying them; otherwise take the newer frame instead
+            borrowed = crops = None
+            while crops is None:
+                borrowed = chip_ring.wait(after=borrowed.seq if borrowed else 0, timeout=1.0)
+                if borrowed is None:
+                    break
+                crops = {name: crop.copy() for name, crop in crop_regions(borrowed.image, regions).items()}
+                if not borrowed.valid():
+                    metrics.counter("chip.torn_frames").inc()
+                    crops = None
+            if crops is None:
+                event_queue.put({
+                    "source": "chip_detection",
+                    "event": "error",
+                    "message": "No frame from chip camera."
+                })
+                chip_detection_event.clear()
+                continue
+            frame_age = time.time() - borrowed.timestamp
+            captured = time.perf_counter()
+
+            # Every region of the same frame goes through the model as one batch
+            results = model(list(crops.values()), show=False, verbose=False) if crops else []
+            inferred = time.perf_counter()
+
+            values = region_values(results, list(crops), class_to_color, chip_values)
+            aggregated = time.perf_counter()
 
-        ret, frame = cap.read()
-        if not ret:
             event_queue.put({
                 "source": "chip_detection",
-                "event": "error",
-                "message": "Failed to capture frame from chip camera."
+                "event": "chip_count",
+                "regions": values,
+                "total_value": sum(values.values()),
+                "latency_ms": {
+                    "capture": (captured - requested) * 1000,
+                    "inference": (inferred - captured) * 1000,
+                    "aggregation": (aggregated - inferred) * 1000,
+                    "total": (aggregated - requested) * 1000,
+                    "frame_age": frame_age * 1000
+                }
             })
-            cap.release()
+            metrics.counter("chip.counts").inc()
+            metrics.histogram("chip.capture").observe((captured - requested) * 1000)
+            metrics.histogram("chip.inference").observe((inferred - captured) * 1000)
+            metrics.histogram("chip.aggregation").observe((aggregated - inferred) * 1000)
             chip_detection_event.clear()
-            continue
-
-        event_queue.put({
-            "source": "chip_detection",
-            "event": "info",
-            "message": "Capturing photo and counting chips..."
-        })
-
-        results = model(frame, show=False)
-        total_value = 0
-        for result in results:
-            for box in result.boxes:
-                chip_class = int(box.cls.item())
-                chip_color = class_to_color.get(chip_class)
-                if chip_color in chip_values:
-                    total_value += chip_values[chip_color]
+    finally:
+        reader.join(timeout=1.0)
+        cap.release()
 
-        event_queue.put({
-            "source": "chip_detection",
-            "event": "chip_count",
-            "total_value": total_value
-        })
 
-        annotated_frame = results[0].plot() if results else frame
-        cap.release()
-        chip_detection_event.clear()
\ No newline at end of file
+def chip_detection_stage(event_queue, stop_event, chip_detection_event, replay_dir=None, record_dir=None, realtime=True):
+    # Body for running chip detection in its own process: a capture cannot be passed across, so it is opened here
+    cap = open_capture("chip", CHIP_CAMERA_INDEX, replay_dir, record_dir, realtime)
+    chip_detection_thread(event_queue, stop_event, chip_detection_event, cap)
@@ -1,9 +1,17 @@
-import queue
+from src.utils.event_dispatcher import STOP
+from src.utils.metrics import metrics
 
-def event_aggregator_thread(event_queue, stop_event):
-    while not stop_event.is_set():
-        try:
-            event = event_queue.get(block=True, timeout=0.5)
-            # print("Event:", event)
-        except queue.Empty:
-            continue
\ No newline at end of file
+def event_aggregator_thread(event_queue, stop_event, dispatcher):
+    # Blocks on the queue (no timeout) and hands each event to the dispatcher as soon as it arrives.
+    # main.py puts STOP on the queue once stop_event is set to wake this thread up.
+    dispatched = metrics.counter("events.dispatched")
+    dispatcher.start()
+    try:
+        while True:
+            event = event_queue.get()
+            if event is STOP:
+                break
+            dispatcher.dispatch(event)
+            dispatched.inc()
+    finally:
+        dispatcher.stop()
@@ -5,7 +5,94 @@ import threading
 import queue
 import numpy as np
 
-def fold_detection_thread(shared_frame, birds_eye_lock, event_queue, stop_event):
+from src.utils.metrics import metrics
+
+LOWER_RED1 = np.array([0, 70, 70])
+UPPER_RED1 = np.array([10, 255, 255])
+LOWER_RED2 = np.array([160, 70, 70])
+UPPER_RED2 = np.array([180, 255, 255])
+SINGLE_CARD_AREA = 800
+OPEN_KERNEL = np.ones((3, 3), np.uint8)
+FOLD_ENTER_SECONDS = 1.0      # Red card must be seen this long before a fold is reported
+FOLD_EXIT_SECONDS = 0.5       # and gone this long before the player is active again
+
+
+class RegionMasks:
+    """
+    Precomputed layout for measuring red area in every player region at once.
+
+    Holds the bounding box of the union of all player areas and a label image
+    over that box (0 outside any area, i + 1 inside area i), so one frame needs
+    a single cvtColor/inRange pass over the union and one connected-components
+    pass to get the largest red blob of every player. Where areas overlap the
+    later one owns the pixels.
+    """
+
+    def __init__(self, player_areas):
+        self.names = list(player_areas)
+        xs = [x for x, y, w, h in player_areas.values()]
+        ys = [y for x, y, w, h in player_areas.values()]
+        self.x0, self.y0 = min(xs), min(ys)
+        self.x1 = max(x + w for x, y, w, h in player_areas.values())
+        self.y1 = max(y + h for x, y, w, h in player_areas.values())
+        self.labels = np.zeros((self.y1 - self.y0, self.x1 - self.x0), dtype=np.intp)
+        for i, (x, y, w, h) in enumerate(player_areas.values()):
+            self.labels[y - self.y0:y - self.y0 + h, x - self.x0:x - self.x0 + w] = i + 1
+        self.outside = self.labels == 0
+
+    def red_areas(self, frame):
+        # Pixel area of the largest red blob per player, in the order of self.names
+        hsv = cv2.cvtColor(frame[self.y0:self.y1, self.x0:self.x1], cv2.COLOR_BGR2HSV)
+        mask = cv2.inRange(hsv, LOWER_RED1, UPPER_RED1) | cv2.inRange(hsv, LOWER_RED2, UPPER_RED2)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, OPEN_KERNEL)     # Drop isolated red speckles
+        mask[self.outside] = 0
+        count, components = cv2.connectedComponents(mask, connectivity=8)
+        players = len(self.names) + 1
+        if count <= 1:
+            return np.zeros(len(self.names), dtype=np.intp)
+        # Pixels per (blob, player), so a blob crossing into a neighbour's area is clipped like a per-player crop would
+        red = mask > 0
+        sizes = np.bincount(components[red] * players + self.labels[red], minlength=count * players)
+        return sizes.reshape(count, players)[1:, 1:].max(axis=0)
+
+    def detect(self, frame):
+        # {player: (folded, area)} for one frame, folded needs one card-sized blob, not scattered red chips
+        areas = self.red_areas(frame)
+        return {name: (bool(area > SINGLE_CARD_AREA * 0.5), int(area)) for name, area in zip(self.names, areas)}
+
+
+class FoldDebouncer:
+    """
+    Per-player hysteresis on frame timestamps, so fold latency is wall-clock
+    time rather than a number of loop iterations.
+
+    A player flips to folded once the red card has been detected continuously
+    for `enter_seconds` and back to active once it has been missing for
+    `exit_seconds`. update() returns "fold" or "unfold" exactly once per
+    transition and None otherwise.
+    """
+
+    def __init__(self, players, enter_seconds=FOLD_ENTER_SECONDS, exit_seconds=FOLD_EXIT_SECONDS):
+        self.enter_seconds = enter_seconds
+        self.exit_seconds = exit_seconds
+        self.folded = {player: False for player in players}
+        self.since = {player: None for player in players}     # When the detection started disagreeing with the state
+
+    def update(self, player, detected, timestamp):
+        if detected == self.folded[player]:
+            self.since[player] = None
+            return None
+        if self.since[player] is None:
+            self.since[player] = timestamp
+        hold = self.exit_seconds if self.folded[player] else self.enter_seconds
+        if timestamp - self.since[player] < hold:
+            return None
+        self.folded[player] = detected
+        self.since[player] = None
+        return "fold" if detected else "unfold"
+
+
+def fold_detection_thread(frame_ring, event_queue, stop_event, headless=False):
     CONFIG_FILE = "vision/config.json"
     try:
         with open(CONFIG_FILE, "r") as f:
@@ -18,14 +105,15 @@ def fold_detection_thread(shared_frame, birds_eye_lock, event_queue, stop_event)
         })
         return
 
-    PLAYER_AREAS = {name: regions[name] for name in regions 
+    PLAYER_AREAS = {name: regions[name] for name in regions
                     if "player" in name and isinstance(regions[name], list) and len(regions[name]) == 4}
 
-    while shared_frame["birds_eye"] is None and not stop_event.is_set():
-        time.sleep(0.01)
-    with birds_eye_lock:
-        frame = shared_frame["birds_eye"].copy()
-    frame_height, frame_width = frame.shape[:2]
+    first = None
+    while first is None and not stop_event.is_set():
+        first = frame_ring.wait(timeout=0.1)
+    if first is None:
+        return
+    frame_height, frame_width = first.image.shape[:2]
 
     def adjust_bounding_box(bbox):
         x, y, w, h = [int(val) for val in bbox]
@@ -36,67 +124,64 @@ def fold_detection_thread(shared_frame, birds_eye_lock, event_queue, stop_event)
         return (x, y, w, h)
 
     PLAYER_AREAS = {name: adjust_bounding_box(bbox) for name, bbox in PLAYER_AREAS.items()}
+    region_masks = RegionMasks(PLAYER_AREAS)
 
-    def detect_red_area(frame, player_area):
-        x, y, w, h = player_area
-        player_region = frame[y:y+h, x:x+w]
-        
-        hsv = cv2.cvtColor(player_region, cv2.COLOR_BGR2HSV)
-        
-        lower_red1 = np.array([0, 70, 70])
-        upper_red1 = np.array([10, 255, 255])
-        lower_red2 = np.array([160, 70, 70])
-        upper_red2 = np.array([180, 255, 255])
-        
-        mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-        mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-        mask = cv2.bitwise_or(mask1, mask2)
-        
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        if contours:
-            largest_contour = max(contours, key=cv2.contourArea, default=None)
-            if largest_contour is not None:
-                area = cv2.contourArea(largest_contour)
-                SINGLE_CARD_AREA = 800
-                if area > SINGLE_CARD_AREA * 0.5:
-                    return True, area
-        return False, 0
-
-    consecutive_folding_counts = {player: 0 for player in PLAYER_AREAS.keys()}
-    FOLD_THRESHOLD = 50
+    settings = regions.get("fold_detection", {})
+    debouncer = FoldDebouncer(PLAYER_AREAS,
+                              settings.get("enter_seconds", FOLD_ENTER_SECONDS),
+                              settings.get("exit_seconds", FOLD_EXIT_SECONDS))
+
+    frames = metrics.counter("fold.frames")
+    skipped = metrics.counter("fold.skipped_frames")
+    handoff = metrics.histogram("fold.frame_age")
+    detect_latency = metrics.histogram("fold.detect")
 
     print("Press 'q' to quit. Players: Place a single red card face down to fold.")
+    last_seq = 0
     while not stop_event.is_set():
-        with birds_eye_lock:
-            if shared_frame["birds_eye"] is None:
-                continue
-            frame = shared_frame["birds_eye"].copy()
+        # Borrow the next new frame read-only, the timeout only lets us notice stop_event
+        borrowed = frame_ring.wait(after=last_seq, timeout=0.1)
+        if borrowed is None:
+            continue
+        # Frame age is the camera -> ring -> this thread handoff, skipped frames are ones we were too slow for
+        handoff.observe((time.time() - borrowed.timestamp) * 1000)
+        if last_seq:
+            skipped.inc(borrowed.seq - last_seq - 1)
+        frames.inc()
+        last_seq = borrowed.seq
+        frame = borrowed.image
 
-        folded_players = []
-        for player_name, player_area in PLAYER_AREAS.items():
-            folded, area = detect_red_area(frame, player_area)
-            if folded:
-                consecutive_folding_counts[player_name] += 1
-            else:
-                consecutive_folding_counts[player_name] = 0
-            is_folded = consecutive_folding_counts[player_name] >= FOLD_THRESHOLD
+        start = time.perf_counter()
+        detections = region_masks.detect(frame)
+        detect_latency.observe((time.perf_counter() - start) * 1000)
+        for player_name in PLAYER_AREAS:
+            folded, area = detections[player_name]
+            transition = debouncer.update(player_name, folded, borrowed.timestamp)
+            if transition is not None:
+                event_queue.put({
+                    "source": "fold_detection",
+                    "event": transition,
+                    "player": player_name,
+                    "area": area,
+                    "timestamp": borrowed.timestamp
+                })
+
+        if headless:
+            continue
 
+        display = frame.copy()      # Only the on-screen annotations need a writable copy
+        for player_name, player_area in PLAYER_AREAS.items():
+            is_folded = debouncer.folded[player_name]
             x, y, w, h = player_area
             color = (0, 0, 255) if is_folded else (0, 255, 0)
             label = f"{player_name}: {'Folded' if is_folded else 'Active'}"
-            if is_folded:
-                folded_players.append(player_name)
-            cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-            cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-        if folded_players:
-            print(f"Folded players: {', '.join(folded_players)}")
+            cv2.rectangle(display, (x, y), (x + w, y + h), color, 2)
+            cv2.putText(display, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
 
-        cv2.imshow("Fold Detection", frame)
+        cv2.imshow("Fold Detection", display)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             stop_event.set()
             break
-        time.sleep(0.01)
-    cv2.destroyWindow("Fold Detection")
\ No newline at end of file
+    if not headless:
+        cv2.destroyWindow("Fold Detection")
@@ -1,17 +1,140 @@
-from inference import InferencePipeline
-from inference.core.interfaces.stream.sinks import render_boxes
-from inference.core.interfaces.camera.entities import VideoFrame
 from dotenv import load_dotenv
+import json
 import os
+import time
 
-def hand_tracking_thread(event_queue, stop_event):
+from src.utils.metrics import metrics
+
+MODEL_ID = "hand_detect-xhlhk/2"
+HAND_LEAVE_SECONDS = 0.5      # A region must be empty this long before hand_left
+HAND_MIN_INTERVAL = 0.25      # At most one event per region per this many seconds
+
+def hand_regions(config):
+    # player_N and pot_area rectangles, the only places a hand matters
+    return {name: tuple(int(v) for v in area) for name, area in config.items()
+            if (name == "pot_area" or name.startswith("player_")) and isinstance(area, list) and len(area) == 4}
+
+class HandRegionTracker:
+    """
+    Turns raw per-frame hand positions into hand_entered/hand_left events per
+    named region. A region is entered on the first frame a hand is inside it
+    and left once it has had no hand for `leave_seconds`, and no region emits
+    more than one event per `min_interval` seconds, so a hand hovering on a
+    boundary or a flickering detection does not flood the event queue.
+    """
+
+    def __init__(self, regions, leave_seconds=HAND_LEAVE_SECONDS, min_interval=HAND_MIN_INTERVAL):
+        self.regions = regions
+        self.leave_seconds = leave_seconds
+        self.min_interval = min_interval
+        self.occupied = {name: False for name in regions}
+        self.last_seen = {name: None for name in regions}
+        self.last_event = {name: None for name in regions}
+
+    def regions_at(self, x, y):
+        return [name for name, (rx, ry, rw, rh) in self.regions.items() if rx <= x <= rx + rw and ry <= y <= ry + rh]
+
+    def update(self, points, timestamp):
+        # points: [(x, y)] of every hand in one frame, returns the events to emit
+        inside = {}
+        for x, y in points:
+            for name in self.regions_at(x, y):
+                inside.setdefault(name, (x, y))
+
+        events = []
+        for name in self.regions:
+            if name in inside:
+                self.last_seen[name] = timestamp
+            last_event = self.last_event[name]
+            if last_event is not None and timestamp - last_event < self.min_interval:
+                continue
+            if name in inside and not self.occupied[name]:
+                x, y = inside[name]
+                events.append({"event": "hand_entered", "region": name, "x": x, "y": y})
+            elif name not in inside and self.occupied[name] and timestamp - self.last_seen[name] >= self.leave_seconds:
+                events.append({"event": "hand_left", "region": name})
+            else:
+                continue
+            self.occupied[name] = events[-1]["event"] == "hand_entered"
+            self.last_event[name] = timestamp
+        for event in events:
+            event["source"] = "hand_tracking"
+            event["timestamp"] = timestamp
+        return events
+
+def load_hand_tracker(event_queue):
+    try:
+        with open("vision/config.json", "r") as f:
+            config = json.load(f)
+    except Exception as e:
+        event_queue.put({
+            "source": "hand_tracking",
+            "event": "error",
+            "message": f"Failed to load config: {e}"
+        })
+        return None
+    settings = config.get("hand_tracking", {})
+    return HandRegionTracker(hand_regions(config),
+                             settings.get("leave_seconds", HAND_LEAVE_SECONDS),
+                             settings.get("min_interval", HAND_MIN_INTERVAL))
+
+def local_hand_tracking(event_queue, stop_event, frame_ring, model_path, tracker, frames, detections):
+    # Offline CPU backend: ONNX model on the configured regions only, skipping frames while no hand is around
+    from src.models.hand_detector import OnnxHandDetector, AdaptiveSkipper
+
+    if not os.path.exists(model_path):
+        event_queue.put({
+            "source": "hand_tracking",
+            "event": "error",
+            "message": f"Hand detection model not found at {model_path}"
+        })
+        return
+    regions = tracker.regions
+
+    detector = OnnxHandDetector(model_path)
+    skipper = AdaptiveSkipper()
+    skipped = metrics.counter("hand.skipped_frames")
+    last_seq = 0
+    while not stop_event.is_set():
+        borrowed = frame_ring.wait(after=last_seq, timeout=0.1)
+        if borrowed is None:
+            continue
+        last_seq = borrowed.seq
+        if not skipper.should_run(borrowed.timestamp):
+            skipped.inc()
+            continue
+        start = time.perf_counter()
+        hands = detector.detect(borrowed.image, regions)
+        metrics.observe_since("hand.inference", start)
+        frames.inc()
+        detections.inc(len(hands))
+        skipper.update(borrowed.timestamp, bool(hands))
+        for event in tracker.update([(x, y) for x, y, confidence, region in hands], borrowed.timestamp):
+            event_queue.put(event)
+
+def hand_tracking_thread(event_queue, stop_event, frame_ring=None, headless=False, backend="roboflow", model_path=None):
+    # backend "onnx" runs a local model file (model_path) and needs no network or API key
+    frames = metrics.counter("hand.frames")
+    detections = metrics.counter("hand.detections")
+    tracker = load_hand_tracker(event_queue)
+    if tracker is None:
+        return
+
+    if backend == "onnx":
+        from src.models.hand_detector import DEFAULT_MODEL_PATH
+        local_hand_tracking(event_queue, stop_event, frame_ring, model_path or DEFAULT_MODEL_PATH, tracker, frames, detections)
+        return
+
+    from inference import InferencePipeline, get_model
+    from inference.core.interfaces.stream.sinks import render_boxes
+    from inference.core.interfaces.camera.entities import VideoFrame
 
     # Load environment variables
     load_dotenv()
-    
+
     # Get API key from environment variable
     api_key = os.getenv("INFERENCE_API_KEY")
-    
+
     if not api_key:
         event_queue.put({
             "source": "hand_tracking",
@@ -19,29 +142,47 @@ def hand_tracking_thread(event_queue, stop_event):
             "message": "INFERENCE_API_KEY environment variable not set"
         })
         return
-    
+
     def my_custom_sink(predictions: dict, video_frame: VideoFrame):
-        for p in predictions.get('predictions', []):
-            event_queue.put({
-                "source": "hand_tracking",
-                "event": "hand_detected",
-                "x": p['x'],
-                "y": p['y']
-            })
-        
+        # Called for every frame, also the ones without a hand, so hand_left can fire
+        frames.inc()
+        detections.inc(len(predictions.get('predictions', [])))
+        points = [(p['x'], p['y']) for p in predictions.get('predictions', [])]
+        for event in tracker.update(points, time.time()):
+            event_queue.put(event)
+
     def combined_sink(predictions: dict, video_frame: VideoFrame):
         render_boxes(predictions, video_frame, annotator=None, display_size=(640,480))
         my_custom_sink(predictions, video_frame)
 
+    if headless:
+        # No virtual camera to read from: run the model on birds-eye frames borrowed from the ring, without rendering
+        model = get_model(MODEL_ID, api_key=api_key)
+        last_seq = 0
+        while not stop_event.is_set():
+            borrowed = frame_ring.wait(after=last_seq, timeout=0.1)
+            if borrowed is None:
+                continue
+            last_seq = borrowed.seq
+            start = time.perf_counter()
+            responses = model.infer(borrowed.image)
+            metrics.observe_since("hand.inference", start)
+            frames.inc()
+            points = [(p.x, p.y) for response in responses for p in response.predictions]
+            detections.inc(len(points))
+            for event in tracker.update(points, borrowed.timestamp):
+                event_queue.put(event)
+        return
+
     virtual_cam_index = 2
-    
+
     pipeline = InferencePipeline.init(
-        model_id="hand_detect-xhlhk/2",
+        model_id=MODEL_ID,
         video_reference=virtual_cam_index,
         on_prediction=combined_sink,
-        api_key="cNMxZM6Ckyg2LD0DiV5n",
+        api_key=api_key,
         video_source_properties={"frame_width": 640.0, "frame_height": 480.0}
     )
-    
+
     pipeline.start()
-    pipeline.join()
\ No newline at end of file
+    pipeline.join()
@@ -1,16 +1,51 @@
 from .shared_state import (
-    shared_frame,
-    birds_eye_lock,
+    frame_ring,
     event_queue,
     stop_event,
     chip_detection_event
 )
+from .frame_ring import FrameRing, Frame
+from .shared_frame_ring import SharedFrameRing
+from .event_dispatcher import EventDispatcher, Subscriber, STOP, log_event
+from .event_queue import EventQueue, DROP_OLDEST, MERGE_LATEST, NEVER_DROP
+from .ai_client import AIServerClient, to_game_message, forward_events
+from .debug_stream import DebugStreamServer, start_debug_stream
+from .metrics import Metrics, metrics, start_metrics_server, metrics_logger_thread
+from .process_stages import StageProcesses, EventChannel, event_relay_thread
+from .frame_source import FrameRecorder, RecordingCapture, ReplayCapture, open_capture, capture_time
 
 __all__ = [
-    'shared_frame',
-    'birds_eye_lock',
+    'frame_ring',
+    'FrameRing',
+    'Frame',
+    'SharedFrameRing',
     'event_queue',
     'stop_event',
     'chip_detection_event',
+    'EventDispatcher',
+    'Subscriber',
+    'STOP',
+    'log_event',
+    'EventQueue',
+    'DROP_OLDEST',
+    'MERGE_LATEST',
+    'NEVER_DROP',
+    'AIServerClient',
+    'to_game_message',
+    'forward_events',
+    'DebugStreamServer',
+    'start_debug_stream',
+    'Metrics',
+    'metrics',
+    'start_metrics_server',
+    'metrics_logger_thread',
+    'StageProcesses',
+    'EventChannel',
+    'event_relay_thread',
+    'FrameRecorder',
+    'RecordingCapture',
+    'ReplayCapture',
+    'open_capture',
+    'capture_time',
     'load_config'
 ]
\ No newline at end of file
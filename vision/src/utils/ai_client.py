@@ -0,0 +1,168 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# Response codes worth retrying, the server never saw or never applied the batch
+RETRY_STATUS = {502, 503, 504}
+
+
+class AIServerClient:
+    """
+    Sends game messages to the AI server over one persistent, pooled session.
+
+    send() only queues the message. A flusher thread waits for the first
+    message, keeps collecting for `window` seconds (or until `max_batch`
+    messages) and posts them all to /batch as NDJSON in one request, so a burst
+    of events costs a single round trip. A request is only retried (up to
+    `retries` times, with exponential backoff) when it cannot have been
+    applied: the connection could not be opened, or a 502/503/504 came back.
+    A connection lost mid-request, a read timeout, a non-JSON reply or a
+    rejection (400) is reported and not retried, since the batch may already
+    be applied and applying it twice would repeat its actions.
+    """
+
+    def __init__(self, url=None, session_id="default", window=0.02, max_batch=64,
+                 retries=3, backoff=0.1, timeout=2.0, on_response=None):
+        self.url = (url or os.getenv("AI_SERVER_URL", "http://localhost:5000")).rstrip("/")
+        self.session_id = session_id
+        self.window = window
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.on_response = on_response
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+        self.pending = queue.Queue()
+        self.last_state = None
+        self.sent = 0
+        self.batches = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, name="AIServerClient", daemon=True)
+        self.thread.start()
+
+    def send(self, message):
+        self.pending.put(message)
+
+    def post(self, message):
+        # Sends one message right away, bypassing the batching window
+        return self._request("/", json.dumps(dict(message, session=self.session_id)), "application/json")
+
+    def _collect(self):
+        # Blocks for the first message, then gathers whatever else arrives within the window
+        first = self.pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                message = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if message is None:
+                self.pending.put(None)      # Flush this batch, then stop
+                break
+            batch.append(message)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            body = "\n".join(json.dumps(dict(message, session=self.session_id)) for message in batch)
+            try:
+                result = self._request("/batch", body, "application/x-ndjson")
+            except Exception as e:      # Never let one bad batch stop the flusher
+                self.failures += 1
+                print(f"AI client dropped a batch of {len(batch)}: {e}")
+                continue
+            if result is not None:
+                self.sent += len(batch)
+                self.batches += 1
+
+    def _request(self, path, body, content_type):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.http.post(self.url + path, data=body, timeout=self.timeout,
+                                          headers={"Content-Type": content_type})
+            except requests.RequestException as e:
+                if not never_sent(e):
+                    self.failures += 1
+                    print(f"AI server request to {path} failed, not retried: {e}")
+                    return None
+                error = str(e)
+            else:
+                if response.status_code not in RETRY_STATUS:
+                    try:
+                        result = response.json()
+                    except ValueError:
+                        self.failures += 1
+                        print(f"AI server sent a non-JSON reply to {path}: HTTP {response.status_code}")
+                        return None
+                    self.last_state = result.get("state", self.last_state)
+                    if self.on_response is not None:
+                        self.on_response(result)
+                    if not result.get("ok"):
+                        self.failures += 1
+                        print(f"AI server rejected {path}: {result.get('error')}")
+                    return result
+                error = f"HTTP {response.status_code}"
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        self.failures += 1
+        print(f"AI server unreachable after {self.retries + 1} attempts: {error}")
+        return None
+
+    def close(self):
+        # Flushes what is queued, then stops the flusher and closes the pooled connections
+        self.pending.put(None)
+        self.thread.join(timeout=self.timeout * (self.retries + 1) + 1)
+        self.http.close()
+
+
+def never_sent(error):
+    # True if the request failed before any of it reached the server, so retrying cannot apply it twice
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def to_game_message(event):
+    # Vision event -> AI server message, None for events the game does not act on
+    if event.get("source") == "fold_detection" and event.get("event") == "fold":
+        return {"type": "action", "action": "fold", "player": int(event["player"].split("_")[-1]) - 1}
+    if event.get("source") == "card_recognition" and event.get("event") == "community_cards":
+        # Only the cards up to the first empty or unreadable slot, so each stays at its place on the board
+        cards = []
+        for card in event["slots"]:
+            if card is None:
+                break
+            cards.append(card)
+        return {"type": "communityCards", "cards": cards} if cards else None
+    return None
+
+
+def forward_events(client):
+    # Dispatcher callback that passes game-relevant vision events to the client
+    def callback(event):
+        message = to_game_message(event)
+        if message is not None:
+            client.send(message)
+    return callback
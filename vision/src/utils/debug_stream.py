@@ -0,0 +1,81 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = b"frame"
+DEFAULT_HOST = "127.0.0.1"      # Unauthenticated view of the table, local only unless asked otherwise
+
+
+class DebugStreamHandler(BaseHTTPRequestHandler):
+    # GET /        newest frame as a single JPEG
+    # GET /stream  MJPEG stream, one JPEG per new frame up to max_fps
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/stream":
+            self.send_response(200)
+            self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=%s" % BOUNDARY.decode())
+            self.end_headers()
+            last_seq = 0
+            try:
+                while not server.stop_event.is_set():
+                    borrowed = server.frame_ring.wait(after=last_seq, timeout=1.0)
+                    if borrowed is None:
+                        continue
+                    last_seq = borrowed.seq
+                    jpeg = server.encode(borrowed.image)
+                    self.wfile.write(b"--" + BOUNDARY + b"\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % len(jpeg))
+                    self.wfile.write(jpeg + b"\r\n")
+                    server.stop_event.wait(1.0 / server.max_fps)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+
+        borrowed = server.frame_ring.latest()
+        if borrowed is None:
+            self.send_error(503, "No frame yet")
+            return
+        jpeg = server.encode(borrowed.image)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(jpeg)))
+        self.end_headers()
+        self.wfile.write(jpeg)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DebugStreamServer(ThreadingHTTPServer):
+    """
+    Lightweight view of the birds-eye frames for headless runs. Nothing is
+    encoded unless a client is connected, and a stream is capped at max_fps.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, frame_ring, stop_event, port, max_fps=5, quality=70, regions=None, host=DEFAULT_HOST):
+        super().__init__((host, port), DebugStreamHandler)
+        self.frame_ring = frame_ring
+        self.stop_event = stop_event
+        self.max_fps = max_fps
+        self.quality = quality
+        self.regions = regions or {}
+
+    def encode(self, image):
+        if self.regions:
+            image = image.copy()
+            for name, (x, y, w, h) in self.regions.items():
+                cv2.rectangle(image, (x, y), (x + w, y + h), (0, 255, 0), 1)
+                cv2.putText(image, name, (x, y - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+        ok, jpeg = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return jpeg.tobytes()
+
+
+def start_debug_stream(frame_ring, stop_event, port, regions=None, host=DEFAULT_HOST):
+    server = DebugStreamServer(frame_ring, stop_event, port, regions=regions, host=host)
+    thread = threading.Thread(target=server.serve_forever, name="DebugStream", daemon=True)
+    thread.start()
+    print(f"Debug stream on http://{host}:{port}/stream")
+    return server
@@ -0,0 +1,114 @@
+import queue
+import threading
+
+# Put on the event queue to wake the aggregator and shut the dispatcher down
+STOP = object()
+
+
+class Subscriber:
+    """One consumer with its own queue and delivery thread, so a slow callback only delays itself."""
+
+    def __init__(self, name, callback, maxsize=256):
+        self.name = name
+        self.callback = callback
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self._run, name=f"Subscriber-{name}", daemon=True)
+
+    def offer(self, event):
+        # Never blocks the dispatcher: when the queue is full the oldest undelivered event is dropped
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is STOP:
+                break
+            try:
+                self.callback(event)
+                self.delivered += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Subscriber {self.name} failed on {event.get('source')}/{event.get('event')}: {e}")
+
+
+class EventDispatcher:
+    """
+    Routes events from the shared event queue to subscribers by their
+    "source" and "event" fields. A subscription with sources or events left
+    as None matches anything, and the matching subscribers for each
+    (source, event) pair are worked out once and cached.
+    """
+
+    def __init__(self):
+        self.subscriptions = []     # (subscriber, sources, events)
+        self.routes = {}
+        self.lock = threading.Lock()
+        self.started = False
+
+    def subscribe(self, name, callback, sources=None, events=None, maxsize=256):
+        subscriber = Subscriber(name, callback, maxsize)
+        with self.lock:
+            self.subscriptions.append((subscriber, set(sources) if sources else None, set(events) if events else None))
+            self.routes.clear()
+            if self.started:
+                subscriber.thread.start()
+        return subscriber
+
+    def route(self, source, event):
+        key = (source, event)
+        subscribers = self.routes.get(key)
+        if subscribers is None:
+            with self.lock:
+                subscribers = self.routes[key] = [
+                    subscriber for subscriber, sources, events in self.subscriptions
+                    if (sources is None or source in sources) and (events is None or event in events)
+                ]
+        return subscribers
+
+    def dispatch(self, event):
+        for subscriber in self.route(event.get("source"), event.get("event")):
+            subscriber.offer(event)
+
+    def start(self):
+        with self.lock:
+            self.started = True
+            for subscriber, _, _ in self.subscriptions:
+                subscriber.thread.start()
+
+    def stop(self):
+        with self.lock:
+            subscribers = [subscriber for subscriber, _, _ in self.subscriptions]
+        for subscriber in subscribers:
+            subscriber.offer(STOP)
+        for subscriber in subscribers:
+            if subscriber.thread.is_alive():
+                subscriber.thread.join(timeout=1.0)
+
+    def stats(self):
+        with self.lock:
+            return {
+                subscriber.name: {
+                    "delivered": subscriber.delivered,
+                    "dropped": subscriber.dropped,
+                    "errors": subscriber.errors,
+                    "pending": subscriber.queue.qsize(),
+                }
+                for subscriber, _, _ in self.subscriptions
+            }
+
+
+def log_event(event):
+    # Default subscriber for errors and status messages
+    print(f"[{event.get('source')}] {event.get('event')}: {event.get('message', '')}")
@@ -0,0 +1,116 @@
+import collections
+import queue
+import threading
+
+from .event_dispatcher import STOP
+
+# What happens to an event when the queue is full
+DROP_OLDEST = "drop_oldest"     # High-rate telemetry: the oldest queued event of this kind makes room
+MERGE_LATEST = "merge_latest"   # State updates: a queued event with the same source/event is replaced in place
+NEVER_DROP = "never_drop"       # Game actions and errors: always queued, even past maxsize
+
+# Per (source, event), anything else is NEVER_DROP. Hand tracking only sends rate-limited
+# hand_entered/hand_left transitions, and dropping a hand_left would leave a hand in its
+# region for good, so nothing is DROP_OLDEST by default; pass policies for chattier sources.
+DEFAULT_POLICIES = {
+    ("chip_detection", "chip_count"): MERGE_LATEST,
+    ("card_recognition", "community_cards"): MERGE_LATEST,
+}
+
+
+class EventQueue:
+    """
+    Bounded replacement for the shared queue.Queue. Producers never block:
+    once `maxsize` events are waiting, a DROP_OLDEST event evicts the oldest
+    queued DROP_OLDEST event (or is dropped itself if there is none), while
+    NEVER_DROP events are always accepted. A MERGE_LATEST event replaces the
+    one of the same source/event still waiting in the queue, keeping its
+    place, so the consumer only ever sees the newest state. Dropped and
+    merged events are counted per "source/event" in stats().
+    """
+
+    def __init__(self, maxsize=256, policies=None):
+        self.maxsize = maxsize
+        self.policies = DEFAULT_POLICIES if policies is None else policies
+        self.entries = collections.deque()     # [policy, event], mutable so a merge can swap the event
+        self.waiting = {}                       # (source, event) -> entry of a queued MERGE_LATEST event
+        self.droppable = 0
+        self.dropped = collections.Counter()
+        self.merged = collections.Counter()
+        self.overflow = 0
+        self.max_depth = 0
+        self.not_empty = threading.Condition(threading.Lock())
+
+    def policy(self, event):
+        if event is STOP:
+            return NEVER_DROP
+        return self.policies.get((event.get("source"), event.get("event")), NEVER_DROP)
+
+    def put(self, event, block=True, timeout=None):
+        # block/timeout are accepted for queue.Queue compatibility, put never waits
+        policy = self.policy(event)
+        with self.not_empty:
+            if policy == MERGE_LATEST:
+                key = (event.get("source"), event.get("event"))
+                entry = self.waiting.get(key)
+                if entry is not None:
+                    entry[1] = event
+                    self.merged[f"{key[0]}/{key[1]}"] += 1
+                    return
+            if len(self.entries) >= self.maxsize and not self._make_room(policy, event):
+                return
+            entry = [policy, event]
+            self.entries.append(entry)
+            if policy == MERGE_LATEST:
+                self.waiting[key] = entry
+            elif policy == DROP_OLDEST:
+                self.droppable += 1
+            self.max_depth = max(self.max_depth, len(self.entries))
+            self.not_empty.notify()
+
+    put_nowait = put
+
+    def _make_room(self, policy, event):
+        # Called with the queue full, returns False if `event` itself should be dropped
+        if self.droppable:
+            for i, (queued_policy, queued) in enumerate(self.entries):
+                if queued_policy == DROP_OLDEST:
+                    del self.entries[i]
+                    self.droppable -= 1
+                    self.dropped[f"{queued.get('source')}/{queued.get('event')}"] += 1
+                    return True
+        if policy == DROP_OLDEST:
+            self.dropped[f"{event.get('source')}/{event.get('event')}"] += 1
+            return False
+        self.overflow += 1
+        return True
+
+    def get(self, block=True, timeout=None):
+        with self.not_empty:
+            if not self.not_empty.wait_for(lambda: self.entries, timeout if block else 0):
+                raise queue.Empty
+            policy, event = self.entries.popleft()
+            if policy == MERGE_LATEST:
+                del self.waiting[(event.get("source"), event.get("event"))]
+            elif policy == DROP_OLDEST:
+                self.droppable -= 1
+            return event
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return len(self.entries)
+
+    def empty(self):
+        return not self.entries
+
+    def stats(self):
+        with self.not_empty:
+            return {
+                "depth": len(self.entries),
+                "max_depth": self.max_depth,
+                "dropped": dict(self.dropped),
+                "merged": dict(self.merged),
+                "overflow": self.overflow,
+            }
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import numpy as np
+
+
+class Frame:
+    """A borrowed, read-only view of one ring slot plus its sequence number and capture time."""
+
+    __slots__ = ("ring", "slot", "seq", "timestamp", "image")
+
+    def __init__(self, ring, slot, seq, timestamp, image):
+        self.ring = ring
+        self.slot = slot
+        self.seq = seq
+        self.timestamp = timestamp
+        self.image = image
+
+    def valid(self):
+        # False once the producer has lapped the ring and started overwriting this slot
+        return self.ring.slot_seq[self.slot] == self.seq
+
+
+class FrameRing:
+    """
+    Preallocated ring of frame slots shared between one producer and any number of consumers.
+
+    The producer fills the next slot in place (reserve(), then commit()), so a
+    frame is written once and never copied again. Consumers borrow the newest
+    slot as a read-only view with latest() or block for a newer one with
+    wait(after=seq). A borrowed frame stays intact until the producer comes
+    round to its slot again, slots - 1 frames later; check frame.valid() if a
+    consumer may hold one for longer than that.
+    """
+
+    def __init__(self, slots=4):
+        self.slots = slots
+        self.buffer = None          # (slots, height, width, channels), allocated on the first reserve()
+        self.slot_seq = [0] * slots
+        self.slot_time = [0.0] * slots
+        self.seq = 0                # Sequence number of the newest committed frame, 0 before the first one
+        self.writing = 0
+        self.condition = threading.Condition()
+
+    def reserve(self, shape, dtype=np.uint8):
+        # Writable slot for the next frame, reallocates the ring if the frame shape changes
+        if self.buffer is None or self.buffer.shape[1:] != tuple(shape) or self.buffer.dtype != dtype:
+            with self.condition:
+                self.buffer = np.zeros((self.slots,) + tuple(shape), dtype=dtype)
+                self.slot_seq = [0] * self.slots
+        self.writing = (self.seq + 1) % self.slots
+        self.slot_seq[self.writing] = -1        # Mark as being overwritten for anyone still holding it
+        return self.buffer[self.writing]
+
+    def commit(self, timestamp=None):
+        with self.condition:
+            self.seq += 1
+            self.slot_seq[self.writing] = self.seq
+            self.slot_time[self.writing] = time.time() if timestamp is None else timestamp
+            self.condition.notify_all()
+        return self.seq
+
+    def write(self, frame, timestamp=None):
+        # Copies a frame that was not read straight into reserve()
+        np.copyto(self.reserve(frame.shape, frame.dtype), frame)
+        return self.commit(timestamp)
+
+    def _borrow(self):
+        slot = self.seq % self.slots
+        image = self.buffer[slot]
+        image.flags.writeable = False
+        return Frame(self, slot, self.seq, self.slot_time[slot], image)
+
+    def latest(self):
+        # Newest frame, None before the first commit
+        with self.condition:
+            if self.seq == 0:
+                return None
+            return self._borrow()
+
+    def wait(self, after=0, timeout=None):
+        # Blocks until a frame newer than `after` is committed, None on timeout
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after, timeout):
+                return None
+            return self._borrow()
@@ -0,0 +1,179 @@
+import os
+import struct
+import time
+
+import cv2
+import numpy as np
+
+'''
+Frame sources the camera threads can read from instead of a physical camera.
+
+ReplayCapture and RecordingCapture look like cv2.VideoCapture (isOpened,
+read, get, release), so a thread does not care where its frames come from.
+Both expose the capture time of the last frame as `timestamp`; use
+capture_time(cap) to get it from any capture.
+
+Recording file (.frames), little endian:
+    Header (24 bytes)
+        magic     4s  b"FRMS"
+        version   H   1
+        channels  H
+        height    I
+        width     I
+        reserved  Q   0
+    Body, one fixed size record per frame
+        timestamp f8
+        image     u1[height][width][channels]
+
+The body is opened with numpy.memmap on replay, so frames are handed out as
+views of the mapped file and nothing is decoded or copied.
+'''
+
+MAGIC = b"FRMS"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIQ")
+
+
+def record_dtype(height, width, channels):
+    return np.dtype([("timestamp", "<f8"), ("image", "u1", (height, width, channels))])
+
+
+def capture_time(cap):
+    # Capture time of the frame just read: the recorded one when replaying, otherwise now
+    timestamp = getattr(cap, "timestamp", None)
+    return time.time() if timestamp is None else timestamp
+
+
+class FrameRecorder:
+    """Appends timestamped frames to a .frames file, the header is written with the first frame."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.count = 0
+
+    def write(self, frame, timestamp):
+        if self.file is None:
+            height, width = frame.shape[:2]
+            channels = frame.shape[2] if frame.ndim == 3 else 1
+            self.shape = frame.shape
+            self.file = open(self.path, "wb", buffering=1 << 22)
+            self.file.write(HEADER.pack(MAGIC, VERSION, channels, height, width, 0))
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape changed from {self.shape} to {frame.shape} while recording {self.path}")
+        self.file.write(struct.pack("<d", timestamp))
+        self.file.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+        self.count += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class RecordingCapture:
+    """Wraps a live capture and records every frame read through it."""
+
+    def __init__(self, cap, path):
+        self.cap = cap
+        self.recorder = FrameRecorder(path)
+        self.timestamp = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        ret, frame = self.cap.read(image) if image is not None else self.cap.read()
+        if ret:
+            self.timestamp = time.time()
+            self.recorder.write(frame, self.timestamp)
+        return ret, frame
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def release(self):
+        self.cap.release()
+        self.recorder.close()
+
+
+class ReplayCapture:
+    """
+    Plays a .frames recording back. With realtime=True frames are paced by
+    their recorded timestamps, otherwise they are returned as fast as they
+    are read. Either way `timestamp` keeps the recorded spacing (shifted to
+    start now), so anything timed on frame timestamps, like fold debouncing,
+    behaves exactly as it did live.
+    """
+
+    def __init__(self, path, realtime=True, loop=False):
+        with open(path, "rb") as f:
+            magic, version, channels, height, width, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} frame recording")
+        dtype = record_dtype(height, width, channels)
+        count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+        self.records = np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+        self.width, self.height = width, height
+        self.realtime = realtime
+        self.loop = loop
+        self.index = 0
+        self.start = None
+        self.timestamp = None
+        self.fps = (count - 1) / (self.records[-1]["timestamp"] - self.records[0]["timestamp"]) if count > 1 else 0
+
+    def isOpened(self):
+        return len(self.records) > 0
+
+    def read(self, image=None):
+        if self.index >= len(self.records):
+            if not self.loop:
+                return False, None
+            self.index = 0
+            self.start = None
+        record = self.records[self.index]
+        recorded = float(record["timestamp"]) - float(self.records[0]["timestamp"])
+        if self.start is None:
+            self.start = time.time()
+        if self.realtime:
+            delay = self.start + recorded - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        self.timestamp = self.start + recorded
+        self.index += 1
+        frame = record["image"]
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return len(self.records)
+        return 0
+
+    def set(self, prop, value):
+        return False
+
+    def release(self):
+        self.records = self.records[:0]
+
+
+def open_capture(name, index, replay_dir=None, record_dir=None, realtime=True):
+    # Capture for one camera: replays <replay_dir>/<name>.frames, or opens `index` and records to <record_dir>/<name>.frames
+    if replay_dir is not None:
+        return ReplayCapture(os.path.join(replay_dir, f"{name}.frames"), realtime=realtime)
+    cap = cv2.VideoCapture(index)
+    if record_dir is not None:
+        os.makedirs(record_dir, exist_ok=True)
+        return RecordingCapture(cap, os.path.join(record_dir, f"{name}.frames"))
+    return cap
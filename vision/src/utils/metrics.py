@@ -0,0 +1,159 @@
+import bisect
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in ms, roughly x1.5 apart from 50us to 10s
+BUCKETS_MS = [round(0.05 * 1.5 ** i, 3) for i in range(31)]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. observe() is a bisect and two additions,
+    with no lock: every stage is recorded from its own thread, and a
+    snapshot taken mid-update is at most one sample off.
+    """
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th sample, never above the largest sample seen
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(BUCKETS_MS[i], self.max) if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p90_ms": self.percentile(0.90),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+        }
+
+
+class Metrics:
+    """
+    Counters, latency histograms and gauges for the vision pipeline, named
+    "<stage>.<metric>" (e.g. "fold.detect"). Gauges are functions sampled
+    only when a snapshot is taken, so queue depths cost nothing in between.
+    Counter rates (e.g. FPS) are worked out between consecutive snapshots.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+        self.last_snapshot = (time.time(), {})
+
+    def counter(self, name):
+        counter = self.counters.get(name)
+        if counter is None:
+            with self.lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def gauge(self, name, fn):
+        with self.lock:
+            self.gauges[name] = fn
+
+    def observe_since(self, name, start):
+        # Records the time since `start` (a perf_counter() value) in histogram `name`
+        self.histogram(name).observe((time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            counters = {name: counter.value for name, counter in self.counters.items()}
+            histograms = {name: histogram.summary() for name, histogram in self.histograms.items()}
+            gauges = dict(self.gauges)
+            last_time, last_counters = self.last_snapshot
+            self.last_snapshot = (now, counters)
+        elapsed = now - last_time
+        gauge_values = {}
+        for name, fn in gauges.items():
+            try:
+                gauge_values[name] = fn()
+            except Exception as e:
+                gauge_values[name] = f"error: {e}"
+        return {
+            "timestamp": now,
+            "threads": sorted(thread.name for thread in threading.enumerate()),
+            "counters": counters,
+            "rates_per_sec": {name: (value - last_counters.get(name, 0)) / elapsed if elapsed > 0 else 0.0
+                              for name, value in counters.items()},
+            "latency": histograms,
+            "gauges": gauge_values,
+        }
+
+
+# Shared registry every thread records into
+metrics = Metrics()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps(self.server.metrics.snapshot(), default=str).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port, registry=metrics, host="127.0.0.1"):
+    # GET http://<host>:<port>/ returns a JSON snapshot, only reachable locally unless host says otherwise
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = registry
+    threading.Thread(target=server.serve_forever, name="MetricsServer", daemon=True).start()
+    print(f"Metrics on http://{host}:{port}/")
+    return server
+
+
+def metrics_logger_thread(stop_event, interval, registry=metrics):
+    # Prints a one-line JSON snapshot every `interval` seconds
+    while not stop_event.wait(interval):
+        print("METRICS " + json.dumps(registry.snapshot(), default=str))
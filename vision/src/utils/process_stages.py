@@ -0,0 +1,117 @@
+import multiprocessing
+import threading
+from multiprocessing.connection import wait
+
+from .metrics import metrics
+
+'''
+Runs detector stages in worker processes so they do not share a GIL with the
+camera and with each other.
+
+A stage is any of the existing thread functions. It is called in the worker
+with the same keyword arguments it takes as a thread, except that its
+`event_queue` is an EventChannel: a one-way pipe back to the parent, where
+event_relay_thread puts everything onto the real event queue. Frames reach
+the stage through a SharedFrameRing and stop_event / chip_detection_event
+must be multiprocessing events from the same context.
+
+Each worker also sends a snapshot of its own metrics registry every
+`metrics_interval` seconds; the relay keeps the newest one per stage in
+`stage_metrics` for the parent's metrics gauges.
+'''
+
+METRICS = "__metrics__"
+
+
+class EventChannel:
+    """The write end of a stage's pipe, with the put() of a queue so stage bodies need no changes."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lock = threading.Lock()        # A stage may put from more than one thread (e.g. the chip camera reader)
+
+    def put(self, event, block=True, timeout=None):
+        with self.lock:
+            self.connection.send(event)
+
+    put_nowait = put
+
+
+def stage_metrics_thread(channel, stop_event, interval):
+    while not stop_event.wait(interval):
+        channel.put((METRICS, metrics.snapshot()))
+
+
+def run_stage(target, connection, metrics_interval, kwargs):
+    # Worker process entry point
+    channel = EventChannel(connection)
+    reporter = threading.Thread(target=stage_metrics_thread, args=(channel, kwargs["stop_event"], metrics_interval), daemon=True)
+    reporter.start()
+    try:
+        target(event_queue=channel, **kwargs)
+    except Exception as e:
+        channel.put({
+            "source": "process_stages",
+            "event": "error",
+            "message": f"{target.__name__} failed: {e}"
+        })
+    finally:
+        connection.close()
+
+
+class StageProcesses:
+    """Starts, relays events from and stops the worker process of every stage."""
+
+    def __init__(self, context=None, metrics_interval=5.0):
+        self.context = context or multiprocessing.get_context("spawn")
+        self.metrics_interval = metrics_interval
+        self.processes = {}         # name -> Process
+        self.connections = {}       # receiving end -> name
+        self.stage_metrics = {}
+
+    def add(self, name, target, **kwargs):
+        receiver, sender = self.context.Pipe(duplex=False)
+        process = self.context.Process(target=run_stage, args=(target, sender, self.metrics_interval, kwargs),
+                                       name=name, daemon=True)
+        self.processes[name] = (process, sender)
+        self.connections[receiver] = name
+
+    def start(self):
+        for process, sender in self.processes.values():
+            process.start()
+            sender.close()      # Only the worker writes, so the relay sees EOF once it exits
+
+    def alive(self):
+        return {name: process.is_alive() for name, (process, _) in self.processes.items()}
+
+    def join(self, timeout=2.0):
+        for process, _ in self.processes.values():
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout)
+
+
+def event_relay_thread(stages, event_queue, stop_event):
+    # Moves events from every stage's pipe onto the event queue until all workers have exited
+    relayed = metrics.counter("stages.relayed")
+    connections = dict(stages.connections)
+    while connections:
+        for connection in wait(list(connections), timeout=0.1):
+            name = connections[connection]
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                del connections[connection]
+                if not stop_event.is_set():
+                    event_queue.put({
+                        "source": "process_stages",
+                        "event": "error",
+                        "message": f"Stage {name} exited"
+                    })
+                continue
+            if isinstance(message, tuple) and message[0] == METRICS:
+                stages.stage_metrics[name] = message[1]
+                continue
+            event_queue.put(message)
+            relayed.inc()
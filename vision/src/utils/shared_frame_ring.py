@@ -0,0 +1,114 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .frame_ring import Frame
+
+
+class SharedFrameRing:
+    """
+    FrameRing whose slots live in multiprocessing.shared_memory, so stages in
+    other processes borrow the birds-eye frames without a copy or a pickle.
+
+    Same interface as FrameRing (reserve/commit/write/latest/wait), but the
+    frame shape is fixed when the ring is created, since the block cannot
+    grow once other processes have mapped it. The ring pickles to the name of
+    the block plus its condition, so it can be passed to a Process as an
+    argument and is attached again on the other side. The process that
+    created it calls close() at shutdown to free the block.
+    """
+
+    def __init__(self, shape, slots=4, dtype=np.uint8, context=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        context = context or multiprocessing.get_context()
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=self.header_size(slots) + slots * frame_bytes)
+        self.condition = context.Condition()
+        self.owner = True
+        self._map()
+        self.header[:] = 0
+
+    @staticmethod
+    def header_size(slots):
+        # seq, then slot_seq and slot_time per slot, 8 bytes each
+        return 8 * (1 + 2 * slots)
+
+    def _map(self):
+        buf = self.shm.buf
+        self.header = np.ndarray((1 + self.slots,), dtype=np.int64, buffer=buf)
+        self.slot_seq = self.header[1:]
+        self.slot_time = np.ndarray((self.slots,), dtype=np.float64, buffer=buf, offset=8 * (1 + self.slots))
+        self.buffer = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=buf, offset=self.header_size(self.slots))
+        self.writing = 0
+
+    def __getstate__(self):
+        return {"name": self.shm.name, "shape": self.shape, "slots": self.slots,
+                "dtype": self.dtype.str, "condition": self.condition}
+
+    def __setstate__(self, state):
+        self.shape = state["shape"]
+        self.slots = state["slots"]
+        self.dtype = np.dtype(state["dtype"])
+        self.condition = state["condition"]
+        self.shm = shared_memory.SharedMemory(name=state["name"])
+        self.owner = False
+        self._map()
+
+    @property
+    def seq(self):
+        # Sequence number of the newest committed frame, 0 before the first one
+        return int(self.header[0])
+
+    def reserve(self, shape, dtype=np.uint8):
+        if tuple(shape) != self.shape or np.dtype(dtype) != self.dtype:
+            raise ValueError(f"Frame is {tuple(shape)} {np.dtype(dtype)} but the shared frame ring was sized for "
+                             f"{self.shape} {self.dtype} frames and cannot be resized while workers have it mapped")
+        self.writing = (self.seq + 1) % self.slots
+        self.slot_seq[self.writing] = -1        # Mark as being overwritten for anyone still holding it
+        return self.buffer[self.writing]
+
+    def commit(self, timestamp=None):
+        with self.condition:
+            seq = self.seq + 1
+            self.slot_seq[self.writing] = seq
+            self.slot_time[self.writing] = time.time() if timestamp is None else timestamp
+            self.header[0] = seq
+            self.condition.notify_all()
+        return seq
+
+    def write(self, frame, timestamp=None):
+        np.copyto(self.reserve(frame.shape, frame.dtype), frame)
+        return self.commit(timestamp)
+
+    def _borrow(self):
+        seq = self.seq
+        slot = seq % self.slots
+        image = self.buffer[slot]
+        image.flags.writeable = False
+        return Frame(self, slot, seq, float(self.slot_time[slot]), image)
+
+    def latest(self):
+        with self.condition:
+            if self.seq == 0:
+                return None
+            return self._borrow()
+
+    def wait(self, after=0, timeout=None):
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.seq > after, timeout):
+                return None
+            return self._borrow()
+
+    def close(self):
+        # Drop the numpy views before closing the mapping, the creating process also frees the block
+        self.header = self.slot_seq = self.slot_time = self.buffer = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass        # A frame is still borrowed somewhere, the mapping goes with the process
+        if self.owner:
+            self.shm.unlink()
@@ -1,9 +1,10 @@
-import queue
 import threading
 
+from .frame_ring import FrameRing
+from .event_queue import EventQueue
+
 # Shared state for all threads
-shared_frame = {"birds_eye": None}
-birds_eye_lock = threading.Lock()
-event_queue = queue.Queue()
+frame_ring = FrameRing()
+event_queue = EventQueue()
 stop_event = threading.Event()
 chip_detection_event = threading.Event()
\ No newline at end of file